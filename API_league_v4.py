@@ -1,10 +1,16 @@
-from get_api_key import get_api_key
 from get_json_retry import get_json_retry
+from region_router import DEFAULT_PLATFORM, get_platform_host
 
-api_key = get_api_key()
-url_ranked='https://na1.api.riotgames.com/lol/league/v4/entries/by-puuid/{}?api_key={}'
+url_ranked='{}/lol/league/v4/entries/by-puuid/{}'
+url_entries='{}/lol/league/v4/entries/{}/{}/{}?page={}'
 
-def get_league_v4_API_json_by_puuid(puuid):
-    _url_ranked=url_ranked.format(puuid, api_key)
+def get_league_v4_API_json_by_puuid(puuid, platform=DEFAULT_PLATFORM):
+    _url_ranked=url_ranked.format(get_platform_host(platform), puuid)
     league_v4_json = get_json_retry(_url_ranked)
     return league_v4_json
+
+# used to seed LeagueV4 for a platform that has not been crawled yet
+def get_league_v4_API_json_by_tier(tier='EMERALD', division='I', queue='RANKED_SOLO_5x5', page=1, platform=DEFAULT_PLATFORM):
+    _url_entries=url_entries.format(get_platform_host(platform), queue, tier, division, page)
+    league_v4_json = get_json_retry(_url_entries)
+    return league_v4_json
@@ -1,9 +1,9 @@
-from get_api_key import get_api_key
 from get_json_retry import get_json_retry
+from region_router import get_platform_from_matchID, get_regional_host
 
-url_match = "https://americas.api.riotgames.com/lol/match/v5/matches/{}?api_key={}" 
+url_match = "{}/lol/match/v5/matches/{}" 
 
 def get_match_API_json_by_matchID(matchID):
-    _url_match = url_match.format(matchID, get_api_key())
+    _url_match = url_match.format(get_regional_host(get_platform_from_matchID(matchID)), matchID)
     match_json = get_json_retry(_url_match)
     return match_json
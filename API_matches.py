@@ -1,12 +1,33 @@
-from get_api_key import get_api_key
+import urllib.parse
+from datetime import datetime
 from get_json_retry import get_json_retry
+from region_router import DEFAULT_PLATFORM, get_regional_host
 
-api_key = get_api_key()
+url_matches = "{}/lol/match/v5/matches/by-puuid/{}/ids?{}"
+MAX_PAGE_SIZE = 100             # API maximum for `count`
 
-# TODO: add pagination
-url_matches = "https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/{}/ids?start=0&count=100&api_key={}"
-
-def get_matches_API_json_by_puuid(puuid):
-    _url_matches = url_matches.format(puuid, api_key)
+def get_matches_API_json_by_puuid(puuid, platform=DEFAULT_PLATFORM, start_time: datetime = None, end_time: datetime = None,
+                                  queue=None, start=0, count=MAX_PAGE_SIZE):
+    """One page of matchIDs of `puuid`, newest first, optionally restricted to [start_time, end_time) and a queue."""
+    params = {'start': start, 'count': count}
+    if start_time:
+        params['startTime'] = int(start_time.timestamp())         # epoch seconds
+    if end_time:
+        params['endTime'] = int(end_time.timestamp())
+    if queue:
+        params['queue'] = queue
+    _url_matches = url_matches.format(get_regional_host(platform), puuid, urllib.parse.urlencode(params))
     matchIDs_list = get_json_retry(_url_matches)
     return matchIDs_list
+
+def get_all_matchIDs_by_puuid(puuid, platform=DEFAULT_PLATFORM, start_time: datetime = None, end_time: datetime = None,
+                              queue=None, max_pages=10):
+    """Every matchID of `puuid` in the time window, following pages until a short page (or `max_pages`)."""
+    matchIDs_list = []
+    for page in range(max_pages):
+        page_ids = get_matches_API_json_by_puuid(puuid, platform, start_time, end_time, queue,
+                                                 start=page * MAX_PAGE_SIZE, count=MAX_PAGE_SIZE) or []
+        matchIDs_list.extend(page_ids)
+        if len(page_ids) < MAX_PAGE_SIZE:
+            break
+    return matchIDs_list
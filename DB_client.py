@@ -1,5 +1,6 @@
 from get_env_var import get_env_var
-from DB_client_mongo import MongoDBClient
+
+SQLITE_PREFIX = 'sqlite:'
 
 def get_client():
     try:
@@ -13,9 +14,26 @@ def get_client():
     except Exception as e:
         print("Error getting DB environment variables: " + str(e))
         raise
-    
+
+    # `sqlite:<path>` selects the embedded backend (single node, no database server required)
+    if db_server_and_port and db_server_and_port.lower().startswith(SQLITE_PREFIX):
+        from DB_client_sqlite import SQLiteDBClient
+        return SQLiteDBClient(db_server_and_port[len(SQLITE_PREFIX):])
+
+    from DB_client_mongo import MongoDBClient      # backend modules are only imported when selected
     return MongoDBClient(db_server_and_port, db_usr, db_pwd, db_database)
 
-# Create a module-level `db` instance so callers can import `db` directly
-# Example: `from DB_client import db`
-db = get_client()
+_db = None
+
+def get_db():
+    """Return the shared client, connecting on first use (importing this module has no side effects)."""
+    global _db
+    if _db is None:
+        _db = get_client()
+    return _db
+
+# Module-level `db` is resolved lazily so callers can keep using `DB_client.db` / `from DB_client import db`
+def __getattr__(name):
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,254 @@
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+from get_patch import get_patch
+
+def utcnow() -> datetime:
+    """Timezone-aware current UTC time (pandas-free replacement for `pd.Timestamp.utcnow()`)."""
+    return datetime.now(timezone.utc)
+
+# per participant stats kept in the slim MatchParticipant index (Mongo: full participant stays in the Match document)
+PARTICIPANT_INDEX_FIELDS = (
+    'puuid', 'participantId', 'teamId', 'championId', 'championName', 'teamPosition', 'win',
+    'kills', 'deaths', 'assists', 'champLevel', 'goldEarned', 'totalDamageDealtToChampions',
+    'totalMinionsKilled', 'neutralMinionsKilled', 'visionScore', 'summoner1Id', 'summoner2Id',
+)
+
+def participant_index_docs(matchID: str, match_info_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One slim MatchParticipant document per participant of `match_info_json`."""
+    match_fields = {
+        'matchID': matchID,
+        'gameCreation': match_info_json.get('gameCreation'),
+        'patch': get_patch(match_info_json.get('gameVersion')),
+        'queueId': match_info_json.get('queueId'),
+        'platformId': match_info_json.get('platformId'),
+    }
+    docs = []
+    for p in match_info_json.get('participants') or []:
+        doc = dict(match_fields)
+        doc.update({k: p.get(k) for k in PARTICIPANT_INDEX_FIELDS})
+        docs.append(doc)
+    return docs
+
+# LeagueV4 fields that define a player's rank state; a merge is skipped when none of them changed
+RANK_STATE_FIELDS = ('tier', 'rank', 'leaguePoints', 'wins', 'losses', 'veteran', 'inactive', 'freshBlood', 'hotStreak', 'leagueId')
+
+def rank_state_hash(league_v4_json: Dict[str, Any], platform: str = None) -> str:
+    """Short stable hash of the rank state of a league entry (stored as `rankHash`)."""
+    state = '|'.join(str(league_v4_json.get(k)) for k in RANK_STATE_FIELDS) + '|' + str(platform)
+    return hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+
+def rank_history_point(league_v4_json: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """One point of the rank history time series."""
+    return {'utc': now, 'tier': league_v4_json.get('tier'), 'rank': league_v4_json.get('rank'),
+            'leaguePoints': league_v4_json.get('leaguePoints'),
+            'wins': league_v4_json.get('wins'), 'losses': league_v4_json.get('losses')}
+
+# PlayerSummary: per puuid running totals + the last PLAYER_SUMMARY_RECENT games, maintained at ingest time
+PLAYER_SUMMARY_RECENT = 20
+PLAYER_SUMMARY_GAME_FIELDS = ('matchID', 'gameCreation', 'championName', 'teamPosition', 'win', 'kills', 'deaths', 'assists')
+PLAYER_SUMMARY_TOTALS = ('games', 'wins', 'kills', 'deaths', 'assists')
+
+def player_summary_game(participant_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Ring buffer entry of one game, from a MatchParticipant index document."""
+    game = {k: participant_doc.get(k) for k in PLAYER_SUMMARY_GAME_FIELDS}
+    if game['win'] is not None:
+        game['win'] = bool(game['win'])         # SQLite stores 0/1
+    return game
+
+def apply_player_summary_game(summary: Dict[str, Any], game: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one game (`player_summary_game`) to a PlayerSummary document in place (a new one if `summary` is empty)."""
+    for k in PLAYER_SUMMARY_TOTALS:
+        summary.setdefault(k, 0)
+    summary.setdefault('champions', {})
+    summary.setdefault('positions', {})
+    summary['games'] += 1
+    summary['wins'] += 1 if game.get('win') else 0
+    for k in ('kills', 'deaths', 'assists'):
+        summary[k] += game.get(k) or 0
+    if game.get('championName'):
+        summary['champions'][game['championName']] = summary['champions'].get(game['championName'], 0) + 1
+    if game.get('teamPosition'):
+        summary['positions'][game['teamPosition']] = summary['positions'].get(game['teamPosition'], 0) + 1
+    recent = summary.get('recent', []) + [game]
+    recent.sort(key=lambda g: g.get('gameCreation') or 0)
+    summary['recent'] = recent[-PLAYER_SUMMARY_RECENT:]
+    summary['lastGameCreation'] = max(summary.get('lastGameCreation') or 0, game.get('gameCreation') or 0)
+    return summary
+
+def player_recent_form(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived view of a PlayerSummary: recent win rate / KDA, champion pool and main role."""
+    recent = summary.get('recent') or []
+    deaths = sum(g.get('deaths') or 0 for g in recent)
+    champions = summary.get('champions') or {}
+    positions = summary.get('positions') or {}
+    return {
+        'recentGames': len(recent),
+        'recentWinRate': round(sum(1 for g in recent if g.get('win')) / len(recent), 4) if recent else None,
+        'recentKda': round(sum((g.get('kills') or 0) + (g.get('assists') or 0) for g in recent) / max(1, deaths), 2)
+                     if recent else None,
+        'championPool': sorted(champions, key=lambda c: (-champions[c], c))[:5],     # ties by name: stable across rebuilds
+        'mainRole': min(positions, key=lambda p: (-positions[p], p)) if positions else None,
+    }
+
+class DuplicateMatchError(Exception):
+    """`insert_match_no_commit` of a matchID that is already stored (ie. by a concurrent crawler / backfill)."""
+
+class DBClient(ABC):
+    """Storage interface the crawler (`start.py`) talks to.
+
+    Backends:
+    - `DB_client_mongo.MongoDBClient`   (default, MongoDB server)
+    - `DB_client_sqlite.SQLiteDBClient` (embedded single-file database, no server needed)
+
+    `DB_client.get_client()` picks the backend from the environment.
+    """
+    def __init__(self):
+        self._league_write_stats = {'seen': 0, 'written': 0, 'skipped': 0}
+        self._league_write_stats_lock = threading.Lock()
+
+    def _record_league_writes(self, seen: int, written: int) -> Dict[str, int]:
+        """Count league entries merged vs actually written; returns this merge's counts."""
+        with self._league_write_stats_lock:
+            stats = self._league_write_stats
+            stats['seen'] += seen
+            stats['written'] += written
+            stats['skipped'] += seen - written
+        return {'seen': seen, 'written': written, 'skipped': seen - written}
+
+    def league_write_stats(self) -> Dict[str, Any]:
+        """Cumulative LeagueV4 merge counts: entries seen, written, skipped (unchanged) and % of writes saved."""
+        with self._league_write_stats_lock:
+            stats = dict(self._league_write_stats)
+        stats['saved_pct'] = round(100 * stats['skipped'] / stats['seen'], 1) if stats['seen'] else 0.0
+        return stats
+
+    @abstractmethod
+    def test_connection(self) -> bool:
+        """Return True if the backend is reachable, False otherwise."""
+
+    @abstractmethod
+    def begin_transaction(self):
+        """Start a transaction and return a session handle (or `None` if unsupported)."""
+
+    @abstractmethod
+    def commit_transaction(self, session):
+        """Commit and end the given session. No-op if `session` is `None`."""
+
+    @abstractmethod
+    def close_transaction(self, session):
+        """Abort (rollback) and end the given session. No-op if `session` is `None`."""
+
+    @abstractmethod
+    def select_oldest_ranked_puuids(self, limit: int = 100, platform: str = None) -> List[str]:
+        """Return the ranked puuids least recently crawled (most games played first on ties).
+
+        If `platform` is given only that platform's players are returned.
+        """
+
+    def select_oldest_ranked_puuids_df(self):
+        """`select_oldest_ranked_puuids` as a DataFrame with a `puuid` column (imports pandas)."""
+        import pandas as pd
+        return pd.DataFrame({'puuid': self.select_oldest_ranked_puuids()})
+
+    @abstractmethod
+    def select_matches_in_list_not_in_table(self, matchIDs_list: List[str]) -> List[str]:
+        """Return the matchIDs from `matchIDs_list` that are not stored yet (order preserved)."""
+
+    @abstractmethod
+    def merge_league_v4_no_commit(self, leagues_v4_json: List[Dict[str, Any]], session=None, platform: str = None):
+        """Upsert league entries (tagged with `platform`) without touching `updateMatchesUtc` on existing rows.
+
+        Entries whose rank state (`rank_state_hash`) is unchanged are not written; changed entries also
+        append a point to the rank history. Returns `{'seen', 'written', 'skipped'}` for this call.
+        """
+
+    @abstractmethod
+    def merge_league_v4(self, puuid: str, leagues_v4_json: List[Dict[str, Any]], platform: str = None):
+        """Upsert league entries for `puuid` and mark its matches as updated now."""
+
+    @abstractmethod
+    def select_rank_history(self, puuid: str, queueType: str = 'RANKED_SOLO_5x5') -> List[Dict[str, Any]]:
+        """Rank history points of `puuid` (utc, tier, rank, leaguePoints, wins, losses), oldest first."""
+
+    @abstractmethod
+    def insert_participants_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        """Store the participants of a match (`match_info_json['participants']`) in the per player index."""
+
+    @abstractmethod
+    def update_player_summaries_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        """Fold the participants of a newly stored match into their PlayerSummary (called by `insert_match_no_commit`)."""
+
+    @abstractmethod
+    def rebuild_player_summaries(self, batch_size: int = 1000) -> int:
+        """Recompute every PlayerSummary from the MatchParticipant index. Returns the number of players."""
+
+    @abstractmethod
+    def select_player_summaries(self, puuids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """`{puuid: PlayerSummary + player_recent_form(...)}` of the given puuids (one key lookup each)."""
+
+    @abstractmethod
+    def insert_match_no_commit(self, matchID: str, dataVersion: str, match_info_json: Dict[str, Any], session=None):
+        """Store a match (`match_json['info']`) and its participants, in the same batch.
+
+        Raises `DuplicateMatchError` if `matchID` is already stored."""
+
+    @abstractmethod
+    def insert_match_cold_no_commit(self, matchID: str, cold: Dict[str, Dict[str, Any]], session=None):
+        """Store `{puuid: {'challenges', 'perks', 'missions'}}` of a match compressed in MatchCold."""
+
+    @abstractmethod
+    def select_match_cold(self, matchID: str) -> Dict[str, Dict[str, Any]]:
+        """Load and decompress the cold participant data of a match (see `match_cold.LazyMatchCold`)."""
+
+    @abstractmethod
+    def backfill_match_cold(self, batch_size: int = 1000) -> int:
+        """Move cold participant fields still stored with the hot match data to MatchCold."""
+
+    @abstractmethod
+    def backfill_participant_index(self, batch_size: int = 1000) -> int:
+        """Index the participants of matches stored before the participant index existed. Idempotent."""
+
+    @abstractmethod
+    def select_participant_puuids(self, matchIDs: List[str]) -> List[str]:
+        """Distinct puuids of the participants of stored matches `matchIDs` (from the MatchParticipant index)."""
+
+    @abstractmethod
+    def select_player_history(self, puuid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent games of `puuid`, newest first (matchID, championName, teamPosition, win, gameCreation, stats)."""
+
+    @abstractmethod
+    def select_champion_games(self, championName: str, patch: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Games played on `championName`, optionally restricted to one `patch` (ie. '15.24')."""
+
+    @abstractmethod
+    def select_champion_stats(self, queue_id: int = 420, patch: str = None) -> List[Dict[str, Any]]:
+        """Return `[{'championName', 'games', 'wins'}, ...]` sorted by games played, descending."""
+
+    @abstractmethod
+    def iter_matches(self, batch_size: int = 1000, created_after: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Stream matches (stored after `created_after` if given) as
+        `{'matchID', 'gameCreation', 'gameVersion', 'queueId', 'createdUtc', 'participants': [PARTICIPANT_INDEX_FIELDS]}`
+        without loading the collection into memory.
+        """
+
+    @abstractmethod
+    def select_league_v4_by_puuids(self, puuids: List[str], queueType: str = 'RANKED_SOLO_5x5') -> Dict[str, Dict[str, Any]]:
+        """`{puuid: {'tier', 'rank', 'leaguePoints', 'wins', 'losses'}}` of the given puuids (missing puuids omitted)."""
+
+    @abstractmethod
+    def select_tier_distribution(self, queueType: str = 'RANKED_SOLO_5x5', platform: str = None) -> List[Dict[str, Any]]:
+        """Return `[{'tier', 'rank', 'players'}, ...]`: number of stored players per tier / division."""
+
+    @abstractmethod
+    def select_ingest_watermark(self) -> Dict[str, Any]:
+        """Return `{'matches': <latest Match createdUtc>, 'leagues': <latest LeagueV4 updateRankUtc>}` (None if empty).
+
+        Read-side caches compare watermarks to know whether new data was ingested since they computed a result.
+        """
+
+    @abstractmethod
+    def select_all_matches(self):
+        """Return all matches as a pandas DataFrame."""
@@ -1,7 +1,11 @@
 import os
-import pandas as pd
 from get_env_var import get_env_var
-from typing import Any, Dict, List
+from match_cold import COLD_PARTICIPANT_FIELDS, split_cold_participants, pack_cold, unpack_cold
+from DB_client_base import DBClient, DuplicateMatchError, utcnow, PARTICIPANT_INDEX_FIELDS, participant_index_docs, rank_state_hash, rank_history_point
+from DB_client_base import PLAYER_SUMMARY_RECENT, player_summary_game, apply_player_summary_game, player_recent_form
+from region_router import DEFAULT_PLATFORM
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
 import time
 import ipaddress
 
@@ -10,10 +14,11 @@ try:
 except Exception:
     pymongo = None
 
-class MongoDBClient:
+class MongoDBClient(DBClient):
     def __init__(self, db_server_and_port: str = None, db_usr: str = None, db_pwd: str = None, db_database: str = None):
         if pymongo is None:
             raise ImportError("pymongo is required for MongoDB backend. Install with 'pip install pymongo'.")
+        super().__init__()
         try:
             if not db_server_and_port:
                 self.client = pymongo.MongoClient("192.168.1.167")     # conn to default localhost:27017
@@ -28,12 +33,59 @@ class MongoDBClient:
                 db_database = 'lol_analysis'
 
             self.db = self.client[db_database]
+            self.supports_transactions = self._detect_transactions()
+            self._ensure_indexes()
             print("Connected to MongoDB server:", db_server_and_port)
             print("Connected to MongoDB db_database:", db_database)
         except Exception as e:
             print("Error connecting to database: " + str(e))
             raise
 
+    def _detect_transactions(self) -> bool:
+        """Transactions need a replica set member or mongos; a standalone mongod only rejects them at the first
+        write of the transaction ("Transaction numbers are only allowed on a replica set member or mongos")."""
+        try:
+            hello = self.client.admin.command('hello')
+        except Exception as e:
+            print("Could not detect transaction support, writing without transactions: " + str(e))
+            return False
+        return bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+
+    def _ensure_unique_matchID(self):
+        """Unique Match.matchID, so two crawlers storing the same match (live crawl + backfill) can't both insert it.
+        Databases indexed before were not unique: the old index is replaced, unless duplicates are already stored."""
+        match = self.db['Match']
+        existing = match.index_information().get('matchID_1')
+        if existing and existing.get('unique'):
+            return
+        if existing:
+            match.drop_index('matchID_1')
+        try:
+            match.create_index([('matchID', 1)], unique=True)
+        except pymongo.errors.DuplicateKeyError as e:
+            print("Match has duplicate matchIDs, keeping a non unique index: " + str(e))
+            match.create_index([('matchID', 1)])
+
+    def _ensure_indexes(self):
+        """Create the indexes the crawler / player history queries rely on (no-op if they exist)."""
+        try:
+            self._ensure_unique_matchID()
+            self.db['Match'].create_index([('createdUtc', 1)])
+            league = self.db['LeagueV4']
+            league.create_index([('puuid', 1), ('queueType', 1)])
+            league.create_index([('queueType', 1), ('updateMatchesUtc', 1), ('totalGames', -1)])
+            league.create_index([('updateRankUtc', -1)])
+            self.db['MatchCold'].create_index([('matchID', 1)], unique=True)
+            self.db['LeagueV4History'].create_index([('puuid', 1), ('queueType', 1), ('day', 1)], unique=True)
+            participants = self.db['MatchParticipant']
+            participants.create_index([('matchID', 1), ('puuid', 1)], unique=True)
+            participants.create_index([('puuid', 1), ('gameCreation', -1)])
+            participants.create_index([('championName', 1), ('patch', 1)])
+            self.db['PlayerSummary'].create_index([('puuid', 1)], unique=True)
+        except Exception as e:
+            # server unreachable at startup / emulators without index support: queries still work, only slower
+            print("Could not create indexes: " + str(e))
+
     def test_connection(self) -> bool:
         """Return True if a simple ping to the MongoDB server succeeds, False otherwise."""
         if pymongo is None:
@@ -45,14 +97,14 @@ class MongoDBClient:
         except Exception:
             return False
 
-    # TODO: currently not transactional - pass as session=session on every update/insert
     def begin_transaction(self):
         """Start a client session and begin a transaction.
 
         Returns a `pymongo.client_session.ClientSession` with an active transaction,
-        or `None` if sessions/transactions are not available or could not be started.
+        or `None` if the deployment doesn't support transactions (see `_detect_transactions`)
+        or one could not be started.
         """
-        if pymongo is None:
+        if pymongo is None or not self.supports_transactions:
             return None
         # Some deployments (standalone mongod, or emulators) don't support transactions.
         try:
@@ -103,14 +155,16 @@ class MongoDBClient:
             except Exception:
                 pass
 
-    def select_oldest_ranked_puuids_df(self) -> pd.DataFrame:
+    def select_oldest_ranked_puuids(self, limit: int = 100, platform: str = None) -> List[str]:
         coll = self.db['LeagueV4']
+        filter_q = {'queueType': 'RANKED_SOLO_5x5'}
+        if platform:
+            # entries stored before multi-region crawling have no platform and are all NA1
+            filter_q['platform'] = {'$in': [platform, None]} if platform == DEFAULT_PLATFORM else platform
         cursor = coll.find(
-                    {'queueType': 'RANKED_SOLO_5x5'}, 
-                    {'puuid': 1, '_id': 0}).sort([('updateMatchesUtc', 1), ('totalGames', -1)]).limit(100)
-        docs = list(cursor)
-        df = pd.DataFrame(docs)
-        return df
+                    filter_q, 
+                    {'puuid': 1, '_id': 0}).sort([('updateMatchesUtc', 1), ('totalGames', -1)]).limit(limit)
+        return [doc['puuid'] for doc in cursor]
 
     def select_matches_in_list_not_in_table(self, matchIDs_list: List[str]) -> List[str]:
         if not matchIDs_list:
@@ -120,74 +174,254 @@ class MongoDBClient:
         existing_ids = {doc['matchID'] for doc in existing}
         return [m for m in matchIDs_list if m not in existing_ids]
 
-    def merge_league_v4_no_commit(self, leagues_v4_json: List[Dict[str, Any]], session=None):
+    def merge_league_v4_no_commit(self, leagues_v4_json: List[Dict[str, Any]], session=None, platform: str = None):
         """Upsert league entries for the given `puuid` and update the `updateMatchesUtc` timestamp.
 
         Accepts either a single league dict or a list of league dicts in `leagues_v4_json`.
+        `platform` (ie. NA1, EUW1) is stored with each entry so every region crawls its own players.
         """
         if not leagues_v4_json:
-            return
+            return self._record_league_writes(0, 0)
 
         coll = self.db['LeagueV4']
-        now = pd.Timestamp.utcnow().to_pydatetime()
+        now = utcnow()
         leagues_v4_json = leagues_v4_json if isinstance(leagues_v4_json, list) else [leagues_v4_json]
-        
+
+        # one indexed read of the stored hashes instead of rewriting every entry (writes are what cost oplog / RUs)
+        stored = coll.find(
+                    {'puuid': {'$in': list({doc.get('puuid') for doc in leagues_v4_json})}},
+                    {'puuid': 1, 'queueType': 1, 'rankHash': 1, '_id': 0},
+                    session=session)
+        stored_hashes = {(d.get('queueType'), d.get('puuid')): d.get('rankHash') for d in stored}
+
+        league_ops, history_ops = [], []
+        day = now.strftime('%Y-%m-%d')
         for doc in leagues_v4_json:
+            rank_hash = rank_state_hash(doc, platform)
+            if stored_hashes.get((doc.get('queueType'), doc.get('puuid'))) == rank_hash:
+                continue                                            # nothing changed, skip the write
             filter_q = {'queueType': doc.get('queueType'), 'puuid': doc.get('puuid')}
             update_fields = {k: v for k, v in doc.items()}
             update_fields['totalGames'] = doc.get('wins', 0) + doc.get('losses', 0)
-            update_fields['updateRankUtc'] = now
+            update_fields['updateRankUtc'] = now                    # last time the rank state changed
+            update_fields['rankHash'] = rank_hash
+            if platform:
+                update_fields['platform'] = platform
             # Use $setOnInsert to preserve a createUtc only on insert
-            coll.update_one(
+            league_ops.append(pymongo.UpdateOne(
                 filter_q, 
                 {'$set': update_fields, '$setOnInsert': {'createUtc': now, 'updateMatchesUtc': now}}, 
-                upsert=True,
-                session=session)
-            
-    def merge_league_v4(self, puuid: str, leagues_v4_json: List[Dict[str, Any]]):
+                upsert=True))
+            # rank history bucketed as one document per puuid / queue / day
+            history_ops.append(pymongo.UpdateOne(
+                {'puuid': doc.get('puuid'), 'queueType': doc.get('queueType'), 'day': day},
+                {'$push': {'points': rank_history_point(doc, now)}, '$inc': {'count': 1}},
+                upsert=True))
+
+        if league_ops:
+            coll.bulk_write(league_ops, ordered=False, session=session)
+            self.db['LeagueV4History'].bulk_write(history_ops, ordered=False, session=session)
+        return self._record_league_writes(len(leagues_v4_json), len(league_ops))
+
+    def merge_league_v4(self, puuid: str, leagues_v4_json: List[Dict[str, Any]], platform: str = None):
         """Upsert league entries for the given `puuid` and update the `updateMatchesUtc` timestamp."""
 
-        self.merge_league_v4_no_commit(leagues_v4_json)
+        self.merge_league_v4_no_commit(leagues_v4_json, platform=platform)
 
         coll = self.db['LeagueV4']
-        now = pd.Timestamp.utcnow().to_pydatetime()
+        now = utcnow()
         coll.update_many({'puuid': puuid}, {'$set': {'updateMatchesUtc': now}})
 
-    # participants are part of match document in MongoDB
-    def insert_participants_no_commit(self, matchID: str, participant_json: List[Dict[str, Any]], session=None):
-        coll = self.db['MatchParticipant']
-        docs = []
-        exclude = {'perks', 'challenges', 'missions', 'bountyLevel'}
-        for p in participant_json:
-            doc = {'matchID': matchID}
-            for k, v in p.items():
-                if k not in exclude:
-                    doc[k] = v
-            docs.append(doc)
+    def select_rank_history(self, puuid: str, queueType: str = 'RANKED_SOLO_5x5') -> List[Dict[str, Any]]:
+        """Rank history points of `puuid`, oldest first (flattened from the daily buckets)."""
+        cursor = self.db['LeagueV4History'].find({'puuid': puuid, 'queueType': queueType}, {'points': 1, '_id': 0}).sort('day', 1)
+        return [point for bucket in cursor for point in bucket.get('points', [])]
+
+    @staticmethod
+    def _ignore_duplicates(write):
+        """Run a bulk write, ignoring duplicate key errors (rows written by an earlier, interrupted attempt)."""
+        try:
+            write()
+        except pymongo.errors.BulkWriteError as e:
+            if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])) or e.details.get('writeConcernErrors'):
+                raise
+
+    # full participants are part of the match document, MatchParticipant is a slim per player index of them
+    def insert_participants_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        docs = participant_index_docs(matchID, match_info_json)
         if docs:
-            coll.insert_many(docs, session=session)
+            self._ignore_duplicates(lambda: self.db['MatchParticipant'].insert_many(docs, ordered=False, session=session))
 
     def insert_match_no_commit(self, matchID: str, dataVersion: str, match_info_json: Dict[str, Any], session=None):
         coll = self.db['Match']
         doc = {'matchID': matchID, 'dataVersion': dataVersion}
         
-        match_exclude = {''}     # challenges explode document size
-        participant_exclude = {'challenges'}
+        match_exclude = {''}
+        # challenges / perks / missions explode document size: stored compressed in MatchCold instead
+        hot_participants, cold = split_cold_participants(match_info_json)
         for k, v in match_info_json.items():
             if k == 'participants' and isinstance(v, list):
-                sanitized = []
-                for p in v:
-                    if isinstance(p, dict):
-                        sanitized.append({pk: pv for pk, pv in p.items() if pk not in participant_exclude})
-                    else:
-                        sanitized.append(p)
-                doc['participants'] = sanitized
+                doc['participants'] = hot_participants
             else:
                 if k not in match_exclude:
                     doc[k] = v
         
-        doc['createdUtc'] = pd.Timestamp.utcnow().to_pydatetime()
-        coll.insert_one(doc, session=session)
+        doc['createdUtc'] = utcnow()
+        # Match last: without transactions (standalone mongod) a crash before it leaves the match "not stored",
+        # so the spool replays it; the writes before it are idempotent for that replay
+        self.insert_participants_no_commit(matchID, match_info_json, session)
+        self.insert_match_cold_no_commit(matchID, cold, session)
+        self.update_player_summaries_no_commit(matchID, match_info_json, session)
+        try:
+            coll.insert_one(doc, session=session)
+        except pymongo.errors.DuplicateKeyError as e:
+            raise DuplicateMatchError(matchID) from e
+
+    @staticmethod
+    def _player_summary_update(doc: Dict[str, Any], now):
+        """Guarded upsert adding one MatchParticipant row to its player's summary (a no-op if already counted)."""
+        game = player_summary_game(doc)
+        inc = {'games': 1, 'wins': 1 if game['win'] else 0,
+               'kills': game['kills'] or 0, 'deaths': game['deaths'] or 0, 'assists': game['assists'] or 0}
+        if game['championName']:
+            inc['champions.' + game['championName']] = 1
+        if game['teamPosition']:
+            inc['positions.' + game['teamPosition']] = 1
+        return pymongo.UpdateOne(
+            # matchIDs holds every counted match (recent drops old ones): a replayed match matches no document, so
+            # its upsert hits the unique puuid index (duplicate key, ignored) instead of counting the game twice
+            {'puuid': doc['puuid'], 'matchIDs': {'$ne': doc['matchID']}},
+            {'$push': {'recent': {'$each': [game], '$sort': {'gameCreation': 1}, '$slice': -PLAYER_SUMMARY_RECENT}},
+             '$addToSet': {'matchIDs': doc['matchID']},
+             '$inc': inc,
+             '$max': {'lastGameCreation': game['gameCreation'] or 0},
+             '$set': {'updatedUtc': now}},
+            upsert=True)
+
+    def update_player_summaries_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        """One upsert per participant: ring buffer of recent games ($push / $sort / $slice) + running totals ($inc)."""
+        now = utcnow()
+        ops = [self._player_summary_update(doc, now) for doc in participant_index_docs(matchID, match_info_json)
+               if doc.get('puuid') and doc['puuid'] != 'BOT']
+        if ops:
+            self._ignore_duplicates(lambda: self.db['PlayerSummary'].bulk_write(ops, ordered=False, session=session))
+
+    def _rebuild_player_summary_batch(self, puuids: List[str]):
+        projection = {'_id': 0, 'puuid': 1, 'matchID': 1, 'gameCreation': 1, 'championName': 1, 'teamPosition': 1,
+                      'win': 1, 'kills': 1, 'deaths': 1, 'assists': 1}
+        participants, coll = self.db['MatchParticipant'], self.db['PlayerSummary']
+        summaries = {puuid: {'puuid': puuid, 'matchIDs': []} for puuid in puuids}
+        for doc in participants.find({'puuid': {'$in': puuids}}, projection):
+            apply_player_summary_game(summaries[doc['puuid']], player_summary_game(doc))
+            summaries[doc['puuid']]['matchIDs'].append(doc['matchID'])
+        now = utcnow()
+        coll.bulk_write([pymongo.ReplaceOne({'puuid': puuid}, dict(summary, updatedUtc=now), upsert=True)
+                         for puuid, summary in summaries.items()], ordered=False)
+        # a game ingested between the read and the replace had its $inc overwritten: re-read the batch and add back
+        # whatever the written summaries miss (ingest stores participants before summaries, so nothing slips through)
+        counted = {doc['puuid']: set(doc.get('matchIDs') or ())
+                   for doc in coll.find({'puuid': {'$in': puuids}}, {'_id': 0, 'puuid': 1, 'matchIDs': 1})}
+        ops = [self._player_summary_update(doc, now) for doc in participants.find({'puuid': {'$in': puuids}}, projection)
+               if doc['matchID'] not in counted.get(doc['puuid'], ())]
+        if ops:
+            self._ignore_duplicates(lambda: coll.bulk_write(ops, ordered=False))
+
+    def rebuild_player_summaries(self, batch_size: int = 1000) -> int:
+        """Recompute PlayerSummary from MatchParticipant `batch_size` players at a time; safe while the crawler runs."""
+        started = utcnow()
+        cursor = self.db['MatchParticipant'].find({'puuid': {'$nin': [None, 'BOT']}}, {'_id': 0, 'puuid': 1},
+                                                  batch_size=batch_size).sort([('puuid', 1)])
+        players, batch = 0, []
+        for doc in cursor:
+            if batch and batch[-1] == doc['puuid']:
+                continue
+            if len(batch) >= batch_size:
+                self._rebuild_player_summary_batch(batch)
+                players += len(batch)
+                batch = []
+            batch.append(doc['puuid'])
+        if batch:
+            self._rebuild_player_summary_batch(batch)
+            players += len(batch)
+        # every summary with games was rewritten (or ingested into) since `started`: the rest are stale players
+        self.db['PlayerSummary'].delete_many({'updatedUtc': {'$lt': started}})
+        print("PlayerSummary documents rebuilt:", players)
+        return players
+
+    def select_player_summaries(self, puuids: List[str]) -> Dict[str, Dict[str, Any]]:
+        summaries = {}
+        for doc in self.db['PlayerSummary'].find({'puuid': {'$in': list(puuids)}}, {'_id': 0, 'matchIDs': 0}):
+            doc.update(player_recent_form(doc))
+            summaries[doc['puuid']] = doc
+        return summaries
+
+    def insert_match_cold_no_commit(self, matchID: str, cold: Dict[str, Dict[str, Any]], session=None):
+        """Store the cold participant fields of a match as one compressed blob."""
+        if not cold:
+            return
+        codec, blob = pack_cold(cold)
+        self.db['MatchCold'].replace_one(
+            {'matchID': matchID},
+            {'matchID': matchID, 'codec': codec, 'blob': blob, 'createdUtc': utcnow()},
+            upsert=True,
+            session=session)
+
+    def select_match_cold(self, matchID: str) -> Dict[str, Dict[str, Any]]:
+        """`{puuid: {'challenges', 'perks', 'missions'}}` of a match ({} if none stored)."""
+        doc = self.db['MatchCold'].find_one({'matchID': matchID}, {'codec': 1, 'blob': 1, '_id': 0})
+        return unpack_cold(doc['codec'], doc['blob']) if doc else {}
+
+    def backfill_match_cold(self, batch_size: int = 1000) -> int:
+        """Move perks / missions still embedded in Match documents to MatchCold (challenges were never stored)."""
+        coll = self.db['Match']
+        moved = 0
+        query = {'$or': [{'participants.' + f: {'$exists': True}} for f in COLD_PARTICIPANT_FIELDS]}
+        while True:
+            batch = list(coll.find(query, {'matchID': 1, 'participants': 1}).limit(batch_size))
+            if not batch:
+                break
+            for match_doc in batch:
+                hot_participants, cold = split_cold_participants(match_doc)
+                stored = self.select_match_cold(match_doc['matchID'])
+                for puuid, cold_fields in cold.items():
+                    stored.setdefault(puuid, {}).update(cold_fields)
+                self.insert_match_cold_no_commit(match_doc['matchID'], stored)
+                coll.update_one({'_id': match_doc['_id']}, {'$set': {'participants': hot_participants}})
+            moved += len(batch)
+        print("Match documents moved to MatchCold:", moved)
+        return moved
+
+    def backfill_participant_index(self, batch_size: int = 1000) -> int:
+        """Write MatchParticipant index documents for matches stored before the index existed. Idempotent."""
+        participants = self.db['MatchParticipant']
+        projection = {'_id': 0, 'matchID': 1, 'gameCreation': 1, 'gameVersion': 1, 'queueId': 1, 'platformId': 1}
+        projection.update({'participants.' + k: 1 for k in PARTICIPANT_INDEX_FIELDS})
+        written, ops = 0, []
+        for match_doc in self.db['Match'].find({}, projection, batch_size=batch_size):
+            for doc in participant_index_docs(match_doc['matchID'], match_doc):
+                ops.append(pymongo.ReplaceOne({'matchID': doc['matchID'], 'puuid': doc['puuid']}, doc, upsert=True))
+            if len(ops) >= batch_size:
+                written += participants.bulk_write(ops, ordered=False).upserted_count
+                ops = []
+        if ops:
+            written += participants.bulk_write(ops, ordered=False).upserted_count
+        print("MatchParticipant documents backfilled:", written)
+        return written
+
+    def select_participant_puuids(self, matchIDs: List[str]) -> List[str]:
+        return self.db['MatchParticipant'].distinct('puuid', {'matchID': {'$in': list(matchIDs)}})
+
+    def select_player_history(self, puuid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent games of `puuid` (newest first) from the MatchParticipant index."""
+        cursor = self.db['MatchParticipant'].find({'puuid': puuid}, {'_id': 0}).sort('gameCreation', -1).limit(limit)
+        return list(cursor)
+
+    def select_champion_games(self, championName: str, patch: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Games played on `championName` (optionally on one `patch`) from the MatchParticipant index."""
+        filter_q = {'championName': championName}
+        if patch:
+            filter_q['patch'] = patch
+        return list(self.db['MatchParticipant'].find(filter_q, {'_id': 0}).limit(limit))
 
     def adhoc_league_v4_merge(self):
         league_collection = self.db["LeagueV4"]
@@ -218,13 +452,66 @@ class MongoDBClient:
             ])
             print("Modified count:", result.modified_count)
 
-    def select_all_matches(self) -> pd.DataFrame:
+    def select_champion_stats(self, queue_id: int = 420, patch: str = None) -> List[Dict[str, Any]]:
+        """Return games / wins per champion for `queue_id` (and `patch`), most played first."""
+        coll = self.db['MatchParticipant']
+        match_q = {'queueId': queue_id}
+        if patch:
+            match_q['patch'] = patch
+        pipeline = [
+            {'$match': match_q},
+            {'$group': {
+                '_id': '$championName',
+                'games': {'$sum': 1},
+                'wins': {'$sum': {'$cond': ['$win', 1, 0]}}}},
+            {'$sort': {'games': -1}},
+        ]
+        return [{'championName': doc['_id'], 'games': doc['games'], 'wins': doc['wins']}
+                for doc in coll.aggregate(pipeline)]
+
+    def iter_matches(self, batch_size: int = 1000, created_after: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Stream matches with slim participants (projection on `PARTICIPANT_INDEX_FIELDS`), `batch_size` per round trip."""
+        filter_q = {'createdUtc': {'$gt': created_after}} if created_after else {}
+        projection = {'_id': 0, 'matchID': 1, 'gameCreation': 1, 'gameVersion': 1, 'queueId': 1, 'createdUtc': 1}
+        projection.update({'participants.' + k: 1 for k in PARTICIPANT_INDEX_FIELDS})
+        yield from self.db['Match'].find(filter_q, projection, batch_size=batch_size)
+
+    def select_league_v4_by_puuids(self, puuids: List[str], queueType: str = 'RANKED_SOLO_5x5') -> Dict[str, Dict[str, Any]]:
+        cursor = self.db['LeagueV4'].find(
+                    {'puuid': {'$in': list(puuids)}, 'queueType': queueType},
+                    {'_id': 0, 'puuid': 1, 'tier': 1, 'rank': 1, 'leaguePoints': 1, 'wins': 1, 'losses': 1})
+        return {doc['puuid']: doc for doc in cursor}
+
+    def select_tier_distribution(self, queueType: str = 'RANKED_SOLO_5x5', platform: str = None) -> List[Dict[str, Any]]:
+        """Players per tier / division of `queueType` (and `platform`)."""
+        match_q = {'queueType': queueType}
+        if platform:
+            # same rule as select_oldest_ranked_puuids: untagged rows are NA1
+            match_q['platform'] = {'$in': [platform, None]} if platform == DEFAULT_PLATFORM else platform
+        pipeline = [
+            {'$match': match_q},
+            {'$group': {'_id': {'tier': '$tier', 'rank': '$rank'}, 'players': {'$sum': 1}}},
+        ]
+        return [{'tier': doc['_id'].get('tier'), 'rank': doc['_id'].get('rank'), 'players': doc['players']}
+                for doc in self.db['LeagueV4'].aggregate(pipeline)]
+
+    def select_ingest_watermark(self) -> Dict[str, Any]:
+        """Latest Match createdUtc / LeagueV4 updateRankUtc, each one index lookup."""
+        watermark = {}
+        for key, coll, field in (('matches', 'Match', 'createdUtc'), ('leagues', 'LeagueV4', 'updateRankUtc')):
+            doc = self.db[coll].find_one({field: {'$ne': None}}, {'_id': 0, field: 1}, sort=[(field, -1)])
+            value = doc.get(field) if doc else None
+            watermark[key] = value.isoformat() if isinstance(value, datetime) else value
+        return watermark
+
+    def select_all_matches(self) -> "pd.DataFrame":
         """Return all documents from the `Match` collection as a pandas DataFrame.
 
         Note: reading an entire collection into memory can be large — consider
         adding a `filter`, `projection` or `limit` parameters if you expect many
         documents.
         """
+        import pandas as pd     # analysis-only dependency, kept off the crawler import path
         coll = self.db['Match']
         cursor = coll.find()
         docs = list(cursor)
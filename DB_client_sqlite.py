@@ -0,0 +1,577 @@
+import os
+import json
+import sqlite3
+from typing import Any, Dict, Iterator, List
+import time
+import threading
+import itertools
+from datetime import datetime
+from DB_client_base import DBClient, DuplicateMatchError, utcnow, PARTICIPANT_INDEX_FIELDS, rank_state_hash, rank_history_point
+from DB_client_base import PLAYER_SUMMARY_GAME_FIELDS, PLAYER_SUMMARY_TOTALS, participant_index_docs, player_summary_game, apply_player_summary_game, player_recent_form
+from get_patch import get_patch
+from match_cold import split_cold_participants, pack_cold, unpack_cold
+from region_router import DEFAULT_PLATFORM
+
+# Column layout follows sql/CREATE TABLE *.sql (SQL Server types mapped to SQLite affinities,
+# computed columns dropped). `teams` is kept as a JSON blob since it is never queried by column.
+MATCH_COLUMNS = (
+    'matchID', 'dataVersion', 'endOfGameResult', 'gameDuration', 'gameId', 'gameMode', 'gameName',
+    'gameType', 'gameVersion', 'mapId', 'platformId', 'queueId', 'tournamentCode', 'gameCreation',
+    'gameStartTimestamp', 'gameEndTimestamp', 'teams', 'createdUtc',
+)
+
+MATCH_PARTICIPANT_COLUMNS = (
+    'matchID', 'participantId', 'puuid', 'riotIdGameName', 'riotIdTagline', 'individualPosition',
+    'kills', 'deaths', 'assists', 'championId', 'championName', 'championTransform', 'champExperience',
+    'champLevel', 'allInPings', 'assistMePings', 'baronKills', 'basicPings', 'commandPings',
+    'consumablesPurchased', 'damageDealtToBuildings', 'damageDealtToEpicMonsters', 'damageDealtToObjectives',
+    'damageDealtToTurrets', 'damageSelfMitigated', 'dangerPings', 'detectorWardsPlaced', 'doubleKills',
+    'dragonKills', 'eligibleForProgression', 'enemyMissingPings', 'enemyVisionPings', 'firstBloodAssist',
+    'firstBloodKill', 'firstTowerAssist', 'firstTowerKill', 'gameEndedInEarlySurrender', 'gameEndedInSurrender',
+    'getBackPings', 'goldEarned', 'goldSpent', 'holdPings', 'inhibitorKills', 'inhibitorTakedowns',
+    'inhibitorsLost', 'item0', 'item1', 'item2', 'item3', 'item4', 'item5', 'item6', 'itemsPurchased',
+    'killingSprees', 'lane', 'largestCriticalStrike', 'largestKillingSpree', 'largestMultiKill',
+    'longestTimeSpentLiving', 'magicDamageDealt', 'magicDamageDealtToChampions', 'magicDamageTaken',
+    'needVisionPings', 'neutralMinionsKilled', 'nexusKills', 'nexusLost', 'nexusTakedowns', 'objectivesStolen',
+    'objectivesStolenAssists', 'onMyWayPings', 'pentaKills', 'physicalDamageDealt',
+    'physicalDamageDealtToChampions', 'physicalDamageTaken', 'placement', 'playerAugment1', 'playerAugment2',
+    'playerAugment3', 'playerAugment4', 'playerAugment5', 'playerAugment6', 'PlayerScore0', 'PlayerScore1',
+    'PlayerScore10', 'PlayerScore11', 'PlayerScore2', 'PlayerScore3', 'PlayerScore4', 'PlayerScore5',
+    'PlayerScore6', 'PlayerScore7', 'PlayerScore8', 'PlayerScore9', 'playerSubteamId', 'profileIcon',
+    'pushPings', 'quadraKills', 'retreatPings', 'role', 'sightWardsBoughtInGame', 'spell1Casts', 'spell2Casts',
+    'spell3Casts', 'spell4Casts', 'subteamPlacement', 'summoner1Casts', 'summoner1Id', 'summoner2Casts',
+    'summoner2Id', 'summonerId', 'summonerLevel', 'summonerName', 'teamEarlySurrendered', 'teamPosition',
+    'timeCCingOthers', 'timePlayed', 'totalAllyJungleMinionsKilled', 'totalDamageDealt',
+    'totalDamageDealtToChampions', 'totalDamageShieldedOnTeammates', 'totalDamageTaken',
+    'totalEnemyJungleMinionsKilled', 'totalHeal', 'totalHealsOnTeammates', 'totalMinionsKilled',
+    'totalTimeCCDealt', 'totalTimeSpentDead', 'totalUnitsHealed', 'tripleKills', 'trueDamageDealt',
+    'trueDamageDealtToChampions', 'trueDamageTaken', 'turretKills', 'turretTakedowns', 'turretsLost',
+    'unrealKills', 'visionClearedPings', 'visionScore', 'visionWardsBoughtInGame', 'wardsKilled', 'wardsPlaced',
+    'teamId', 'win',
+    # filled by adhoc_league_v4_merge (SQLite equivalent of embedding LeagueV4 in the match document)
+    'tier', 'rank', 'leaguePoints',
+    # copied from the match so player / champion history queries don't need the join
+    'gameCreation', 'patch', 'queueId', 'platformId',
+)
+_MATCH_PARTICIPANT_MATCH_COLUMNS = ('gameCreation', 'patch', 'queueId', 'platformId')
+
+LEAGUE_V4_COLUMNS = (
+    'puuid', 'queueType', 'leagueId', 'tier', 'rank', 'leaguePoints', 'wins', 'losses', 'totalGames',
+    'veteran', 'inactive', 'freshBlood', 'hotStreak', 'createUtc', 'updateRankUtc', 'updateMatchesUtc',
+    'platform', 'rankHash',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS LeagueV4 (
+    puuid TEXT NOT NULL,
+    queueType TEXT NOT NULL,
+    leagueId TEXT,
+    tier TEXT,
+    rank TEXT,
+    leaguePoints INTEGER,
+    wins INTEGER,
+    losses INTEGER,
+    totalGames INTEGER,
+    veteran INTEGER,
+    inactive INTEGER,
+    freshBlood INTEGER,
+    hotStreak INTEGER,
+    createUtc TEXT,
+    updateRankUtc TEXT,
+    updateMatchesUtc TEXT,
+    PRIMARY KEY (puuid, queueType)
+);
+
+-- rank history: one row per observed rank change
+CREATE TABLE IF NOT EXISTS LeagueV4History (
+    puuid TEXT NOT NULL,
+    queueType TEXT NOT NULL,
+    day TEXT NOT NULL,
+    utc TEXT NOT NULL,
+    tier TEXT,
+    rank TEXT,
+    leaguePoints INTEGER,
+    wins INTEGER,
+    losses INTEGER
+);
+CREATE INDEX IF NOT EXISTS IX_LeagueV4History_puuid ON LeagueV4History (puuid, queueType, day);
+
+CREATE TABLE IF NOT EXISTS Match (
+    matchID TEXT PRIMARY KEY,
+    dataVersion TEXT,
+    endOfGameResult TEXT,
+    gameDuration INTEGER,
+    gameId INTEGER,
+    gameMode TEXT,
+    gameName TEXT,
+    gameType TEXT,
+    gameVersion TEXT,
+    mapId INTEGER,
+    platformId TEXT,
+    queueId INTEGER,
+    tournamentCode TEXT,
+    gameCreation INTEGER,
+    gameStartTimestamp INTEGER,
+    gameEndTimestamp INTEGER,
+    teams TEXT,
+    createdUtc TEXT
+);
+
+CREATE INDEX IF NOT EXISTS IX_Match_createdUtc ON Match (createdUtc);
+
+-- per player running totals + ring buffer of recent games (JSON), maintained at ingest time
+CREATE TABLE IF NOT EXISTS PlayerSummary (
+    puuid TEXT PRIMARY KEY,
+    games INTEGER,
+    wins INTEGER,
+    kills INTEGER,
+    deaths INTEGER,
+    assists INTEGER,
+    lastGameCreation INTEGER,
+    champions TEXT,
+    positions TEXT,
+    recent TEXT,
+    updatedUtc TEXT
+);
+
+-- challenges / perks / missions of all participants, one compressed blob per match (see match_cold.py)
+CREATE TABLE IF NOT EXISTS MatchCold (
+    matchID TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    blob BLOB NOT NULL
+);
+"""
+
+# TEXT for the string columns of sql/CREATE TABLE MatchParticipant.sql, INTEGER for everything else
+_MATCH_PARTICIPANT_TEXT_COLUMNS = {
+    'matchID', 'puuid', 'riotIdGameName', 'riotIdTagline', 'individualPosition', 'championName', 'lane',
+    'role', 'summonerId', 'summonerName', 'teamPosition', 'tier', 'rank', 'patch', 'platformId',
+}
+
+def _utcnow_iso() -> str:
+    return utcnow().isoformat()
+
+def _to_sql_value(v):
+    """bool -> 0/1, nested dict/list -> JSON text, everything else unchanged."""
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, separators=(',', ':'))
+    return v
+
+class SQLiteDBClient(DBClient):
+    """Embedded storage backend (single file, no server) implementing the same interface as MongoDBClient.
+
+    Writes use `executemany` bulk statements; the database runs in WAL mode so readers
+    (ad-hoc analysis) don't block the crawler while it writes. Each thread (one crawl loop per
+    platform) gets its own connection; write transactions are serialized by SQLite's busy timeout.
+    """
+    def __init__(self, db_path: str = None):
+        super().__init__()
+        if not db_path:
+            db_path = os.path.join('data', 'lol_analysis.db')
+        try:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self.db_path = db_path
+            self._local = threading.local()
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(_SCHEMA)
+            self._create_match_participant_table()
+            self._add_missing_columns('LeagueV4', {'platform': 'TEXT', 'rankHash': 'TEXT'})
+            self.conn.execute("CREATE INDEX IF NOT EXISTS IX_LeagueV4_platform_oldest "
+                              "ON LeagueV4 (queueType, platform, updateMatchesUtc, totalGames DESC)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS IX_LeagueV4_updateRankUtc ON LeagueV4 (updateRankUtc)")
+            print("Connected to SQLite database:", db_path)
+        except Exception as e:
+            print("Error connecting to database: " + str(e))
+            raise
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection of the calling thread (sqlite3 connections must not be shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transactions are controlled explicitly via begin/commit_transaction
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=60)
+            conn.execute('PRAGMA synchronous=NORMAL')      # safe in WAL mode, fsync only at checkpoints
+            self._local.conn = conn
+        return conn
+
+    def _add_missing_columns(self, table: str, columns: Dict[str, str]):
+        """Add `{column: type}` to a table created by an older version of this module."""
+        existing = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+        for column, column_type in columns.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _create_match_participant_table(self):
+        cols = ',\n    '.join(
+            f"{c} {'TEXT' if c in _MATCH_PARTICIPANT_TEXT_COLUMNS else 'INTEGER'}" for c in MATCH_PARTICIPANT_COLUMNS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS MatchParticipant (\n    {cols},\n"
+                          f"    PRIMARY KEY (matchID, participantId)\n)")
+        self._add_missing_columns('MatchParticipant', {c: 'TEXT' if c in _MATCH_PARTICIPANT_TEXT_COLUMNS else 'INTEGER'
+                                                       for c in _MATCH_PARTICIPANT_MATCH_COLUMNS})
+        self.conn.execute("DROP INDEX IF EXISTS IX_MatchParticipant_puuid")     # superseded by (puuid, gameCreation)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS IX_MatchParticipant_puuid_gameCreation "
+                          "ON MatchParticipant (puuid, gameCreation DESC)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS IX_MatchParticipant_championName_patch "
+                          "ON MatchParticipant (championName, patch)")
+
+    def test_connection(self) -> bool:
+        """Return True if a trivial query succeeds, False otherwise."""
+        try:
+            self.conn.execute('SELECT 1').fetchone()
+            return True
+        except Exception:
+            return False
+
+    def begin_transaction(self):
+        """Begin a transaction on the thread's connection and return the connection as the session handle."""
+        self.conn.execute('BEGIN IMMEDIATE')        # take the write lock up front, no upgrade deadlocks between threads
+        return self.conn
+
+    def commit_transaction(self, session):
+        """Commit the transaction started by `begin_transaction`. No-op if `session` is `None`."""
+        if not session:
+            return None
+        if session.in_transaction:
+            session.execute('COMMIT')
+
+    def close_transaction(self, session):
+        """Rollback the transaction if it is still open (ie. commit was never reached)."""
+        if not session:
+            return None
+        try:
+            if session.in_transaction:
+                session.execute('ROLLBACK')
+        except Exception:
+            pass
+
+    def select_oldest_ranked_puuids(self, limit: int = 100, platform: str = None) -> List[str]:
+        where, params = "queueType = 'RANKED_SOLO_5x5'", []
+        if platform:
+            # rows stored before multi-region crawling have no platform and are all NA1
+            where += " AND (platform = ? OR platform IS NULL)" if platform == DEFAULT_PLATFORM else " AND platform = ?"
+            params.append(platform)
+        rows = self.conn.execute(
+            f"SELECT puuid FROM LeagueV4 WHERE {where} "
+            "ORDER BY updateMatchesUtc ASC, totalGames DESC LIMIT ?", (*params, limit)).fetchall()
+        return [r[0] for r in rows]
+
+    def _select_in_chunks(self, sql: str, keys: List[Any], params: tuple = ()) -> Iterator[tuple]:
+        """Rows of `sql` whose `{keys}` placeholder is an IN list of `keys`, run in chunks of 500 keys
+        (stays below SQLITE_MAX_VARIABLE_NUMBER on old sqlite builds). `params` bind before the keys."""
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            yield from self.conn.execute(sql.format(keys=','.join('?' * len(chunk))), (*params, *chunk))
+
+    def select_matches_in_list_not_in_table(self, matchIDs_list: List[str]) -> List[str]:
+        if not matchIDs_list:
+            return []
+        existing_ids = {r[0] for r in self._select_in_chunks("SELECT matchID FROM Match WHERE matchID IN ({keys})", matchIDs_list)}
+        return [m for m in matchIDs_list if m not in existing_ids]
+
+    def merge_league_v4_no_commit(self, leagues_v4_json: List[Dict[str, Any]], session=None, platform: str = None):
+        """Upsert league entries; `createUtc` and `updateMatchesUtc` are only set on insert.
+
+        Accepts either a single league dict or a list of league dicts in `leagues_v4_json`.
+        `platform` (ie. NA1, EUW1) is stored with each entry so every region crawls its own players.
+        """
+        if not leagues_v4_json:
+            return self._record_league_writes(0, 0)
+
+        now = utcnow()
+        now_iso = now.isoformat()
+        leagues_v4_json = leagues_v4_json if isinstance(leagues_v4_json, list) else [leagues_v4_json]
+
+        stored_hashes = {(r[0], r[1]): r[2] for r in self._select_in_chunks(
+            "SELECT queueType, puuid, rankHash FROM LeagueV4 WHERE puuid IN ({keys})",
+            {doc.get('puuid') for doc in leagues_v4_json})}
+
+        rows, history_rows = [], []
+        day = now.strftime('%Y-%m-%d')
+        for doc in leagues_v4_json:
+            rank_hash = rank_state_hash(doc, platform)
+            if stored_hashes.get((doc.get('queueType'), doc.get('puuid'))) == rank_hash:
+                continue                                            # nothing changed, skip the write
+            row = {c: _to_sql_value(doc.get(c)) for c in LEAGUE_V4_COLUMNS}
+            row['totalGames'] = doc.get('wins', 0) + doc.get('losses', 0)
+            row['createUtc'] = now_iso
+            row['updateRankUtc'] = now_iso                          # last time the rank state changed
+            row['updateMatchesUtc'] = now_iso
+            row['platform'] = platform
+            row['rankHash'] = rank_hash
+            rows.append(tuple(row[c] for c in LEAGUE_V4_COLUMNS))
+            point = rank_history_point(doc, now)
+            history_rows.append((doc.get('puuid'), doc.get('queueType'), day, now_iso, point['tier'], point['rank'],
+                                 point['leaguePoints'], point['wins'], point['losses']))
+
+        if rows:
+            on_conflict = ', '.join(f"{c} = excluded.{c}" for c in LEAGUE_V4_COLUMNS
+                                    if c not in ('puuid', 'queueType', 'createUtc', 'updateMatchesUtc', 'platform'))
+            on_conflict += ", platform = COALESCE(excluded.platform, LeagueV4.platform)"
+            self.conn.executemany(
+                f"INSERT INTO LeagueV4 ({', '.join(LEAGUE_V4_COLUMNS)}) VALUES ({', '.join('?' * len(LEAGUE_V4_COLUMNS))}) "
+                f"ON CONFLICT (puuid, queueType) DO UPDATE SET {on_conflict}",
+                rows)
+            self.conn.executemany(
+                "INSERT INTO LeagueV4History (puuid, queueType, day, utc, tier, rank, leaguePoints, wins, losses) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                history_rows)
+        return self._record_league_writes(len(leagues_v4_json), len(rows))
+
+    def merge_league_v4(self, puuid: str, leagues_v4_json: List[Dict[str, Any]], platform: str = None):
+        """Upsert league entries for the given `puuid` and update the `updateMatchesUtc` timestamp."""
+        session = self.begin_transaction()
+        try:
+            self.merge_league_v4_no_commit(leagues_v4_json, platform=platform)
+            self.conn.execute("UPDATE LeagueV4 SET updateMatchesUtc = ? WHERE puuid = ?", (_utcnow_iso(), puuid))
+            self.commit_transaction(session)
+        finally:
+            self.close_transaction(session)
+
+    def select_rank_history(self, puuid: str, queueType: str = 'RANKED_SOLO_5x5') -> List[Dict[str, Any]]:
+        """Rank history points of `puuid`, oldest first."""
+        rows = self.conn.execute(
+            "SELECT utc, tier, rank, leaguePoints, wins, losses FROM LeagueV4History "
+            "WHERE puuid = ? AND queueType = ? ORDER BY day, utc", (puuid, queueType)).fetchall()
+        return [dict(zip(('utc', 'tier', 'rank', 'leaguePoints', 'wins', 'losses'), r)) for r in rows]
+
+    # participants are normalized into MatchParticipant columns (nested perks / challenges / missions dropped)
+    def insert_participants_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        match_values = {
+            'matchID': matchID,
+            'gameCreation': match_info_json.get('gameCreation'),
+            'patch': get_patch(match_info_json.get('gameVersion')),
+            'queueId': match_info_json.get('queueId'),
+            'platformId': match_info_json.get('platformId'),
+        }
+        rows = []
+        for p in match_info_json.get('participants') or []:
+            rows.append([match_values[c] if c in match_values else _to_sql_value(p.get(c))
+                         for c in MATCH_PARTICIPANT_COLUMNS])
+        if rows:
+            self.conn.executemany(
+                f"INSERT INTO MatchParticipant ({', '.join(MATCH_PARTICIPANT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(MATCH_PARTICIPANT_COLUMNS))})",
+                rows)
+
+    def insert_match_no_commit(self, matchID: str, dataVersion: str, match_info_json: Dict[str, Any], session=None):
+        row = {c: _to_sql_value(match_info_json.get(c)) for c in MATCH_COLUMNS}
+        row['matchID'] = matchID
+        row['dataVersion'] = dataVersion
+        row['createdUtc'] = _utcnow_iso()
+        try:
+            self.conn.execute(
+                f"INSERT INTO Match ({', '.join(MATCH_COLUMNS)}) VALUES ({', '.join('?' * len(MATCH_COLUMNS))})",
+                tuple(row[c] for c in MATCH_COLUMNS))
+        except sqlite3.IntegrityError as e:
+            if 'Match.matchID' in str(e):
+                raise DuplicateMatchError(matchID) from e
+            raise
+        self.insert_participants_no_commit(matchID, match_info_json, session)
+        self.insert_match_cold_no_commit(matchID, split_cold_participants(match_info_json)[1], session)
+        self.update_player_summaries_no_commit(matchID, match_info_json, session)
+
+    def _select_player_summary_rows(self, puuids: List[str]) -> Dict[str, Dict[str, Any]]:
+        columns = ('puuid',) + PLAYER_SUMMARY_TOTALS + ('lastGameCreation', 'champions', 'positions', 'recent', 'updatedUtc')
+        summaries = {}
+        for r in self._select_in_chunks(f"SELECT {', '.join(columns)} FROM PlayerSummary WHERE puuid IN ({{keys}})", puuids):
+            doc = dict(zip(columns, r))
+            for k in ('champions', 'positions', 'recent'):
+                doc[k] = json.loads(doc[k]) if doc[k] else ({} if k != 'recent' else [])
+            summaries[doc['puuid']] = doc
+        return summaries
+
+    def _write_player_summaries(self, summaries: List[Dict[str, Any]]):
+        now = _utcnow_iso()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO PlayerSummary (puuid, games, wins, kills, deaths, assists, lastGameCreation, "
+            "champions, positions, recent, updatedUtc) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(d['puuid'], *(d[k] for k in PLAYER_SUMMARY_TOTALS), d['lastGameCreation'],
+              json.dumps(d['champions'], separators=(',', ':')), json.dumps(d['positions'], separators=(',', ':')),
+              json.dumps(d['recent'], separators=(',', ':')), now)
+             for d in summaries])
+
+    def update_player_summaries_no_commit(self, matchID: str, match_info_json: Dict[str, Any], session=None):
+        """Read-modify-write of the participants' summaries: one keyed SELECT + one executemany per match."""
+        docs = [d for d in participant_index_docs(matchID, match_info_json) if d.get('puuid') and d['puuid'] != 'BOT']
+        if not docs:
+            return
+        stored = self._select_player_summary_rows([d['puuid'] for d in docs])
+        self._write_player_summaries([apply_player_summary_game(stored.get(d['puuid']) or {'puuid': d['puuid']},
+                                                                player_summary_game(d))
+                                      for d in docs])
+
+    def rebuild_player_summaries(self, batch_size: int = 1000) -> int:
+        """Recompute PlayerSummary from MatchParticipant, `batch_size` players per transaction.
+
+        Each batch reads its players' games and writes their summaries in one short write transaction, so
+        the crawler keeps ingesting (its BEGIN IMMEDIATE only waits for one batch) and a match stored
+        meanwhile is counted exactly once: either before the batch reads it or by its own ingest after.
+        """
+        columns = ('puuid',) + PLAYER_SUMMARY_GAME_FIELDS
+        players, last = 0, ''
+        while True:
+            puuids = [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT puuid FROM MatchParticipant WHERE puuid > ? AND puuid != 'BOT' ORDER BY puuid LIMIT ?",
+                (last, batch_size))]
+            if not puuids:
+                break
+            session = self.begin_transaction()
+            try:
+                summaries = {p: {'puuid': p} for p in puuids}
+                for r in self._select_in_chunks(
+                        f"SELECT {', '.join(columns)} FROM MatchParticipant WHERE puuid IN ({{keys}})", puuids):
+                    apply_player_summary_game(summaries[r[0]], player_summary_game(dict(zip(columns, r))))
+                self._write_player_summaries(list(summaries.values()))
+                self.commit_transaction(session)
+            finally:
+                self.close_transaction(session)
+            players += len(puuids)
+            last = puuids[-1]
+        self.conn.execute("DELETE FROM PlayerSummary WHERE puuid NOT IN (SELECT puuid FROM MatchParticipant)")
+        print("PlayerSummary rows rebuilt:", players)
+        return players
+
+    def select_player_summaries(self, puuids: List[str]) -> Dict[str, Dict[str, Any]]:
+        summaries = self._select_player_summary_rows(list(puuids))
+        for doc in summaries.values():
+            doc.update(player_recent_form(doc))
+        return summaries
+
+    def insert_match_cold_no_commit(self, matchID: str, cold: Dict[str, Dict[str, Any]], session=None):
+        """Store the cold participant fields of a match as one compressed blob."""
+        if not cold:
+            return
+        codec, blob = pack_cold(cold)
+        self.conn.execute("INSERT OR REPLACE INTO MatchCold (matchID, codec, blob) VALUES (?, ?, ?)", (matchID, codec, blob))
+
+    def select_match_cold(self, matchID: str) -> Dict[str, Dict[str, Any]]:
+        """`{puuid: {'challenges', 'perks', 'missions'}}` of a match ({} if none stored)."""
+        row = self.conn.execute("SELECT codec, blob FROM MatchCold WHERE matchID = ?", (matchID,)).fetchone()
+        return unpack_cold(row[0], row[1]) if row else {}
+
+    def backfill_match_cold(self, batch_size: int = 1000) -> int:
+        """Nothing to move: nested participant fields were never stored in the SQLite tables."""
+        return 0
+
+    def backfill_participant_index(self, batch_size: int = 1000) -> int:
+        """Copy gameCreation / patch / queueId / platformId onto MatchParticipant rows stored before those columns existed."""
+        self.conn.create_function('get_patch', 1, get_patch, deterministic=True)
+        session = self.begin_transaction()
+        try:
+            cur = self.conn.execute(
+                "UPDATE MatchParticipant SET gameCreation = m.gameCreation, patch = get_patch(m.gameVersion), "
+                "queueId = m.queueId, platformId = m.platformId "
+                "FROM Match m WHERE m.matchID = MatchParticipant.matchID AND MatchParticipant.gameCreation IS NULL")
+            self.commit_transaction(session)
+        finally:
+            self.close_transaction(session)
+        print("MatchParticipant rows backfilled:", cur.rowcount)
+        return cur.rowcount
+
+    def _select_participant_index(self, where: str, params, order_limit: str) -> List[Dict[str, Any]]:
+        columns = ('matchID', 'gameCreation', 'patch', 'queueId', 'platformId') + PARTICIPANT_INDEX_FIELDS
+        rows = self.conn.execute(
+            f"SELECT {', '.join(columns)} FROM MatchParticipant WHERE {where} {order_limit}", params).fetchall()
+        docs = [dict(zip(columns, r)) for r in rows]
+        for doc in docs:
+            doc['win'] = bool(doc['win']) if doc['win'] is not None else None
+        return docs
+
+    def select_participant_puuids(self, matchIDs: List[str]) -> List[str]:
+        return [r[0] for r in self._select_in_chunks(
+            "SELECT DISTINCT puuid FROM MatchParticipant WHERE matchID IN ({keys})", matchIDs)]
+
+    def select_player_history(self, puuid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent games of `puuid` (newest first), served by the (puuid, gameCreation) index."""
+        return self._select_participant_index("puuid = ?", (puuid, limit), "ORDER BY gameCreation DESC LIMIT ?")
+
+    def select_champion_games(self, championName: str, patch: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Games played on `championName` (optionally on one `patch`), served by the (championName, patch) index."""
+        if patch:
+            return self._select_participant_index("championName = ? AND patch = ?", (championName, patch, limit), "LIMIT ?")
+        return self._select_participant_index("championName = ?", (championName, limit), "LIMIT ?")
+
+    def adhoc_league_v4_merge(self):
+        """Copy the current solo queue rank of each participant onto its MatchParticipant rows."""
+        cur = self.conn.execute(
+            "UPDATE MatchParticipant SET tier = l.tier, rank = l.rank, leaguePoints = l.leaguePoints "
+            "FROM LeagueV4 l WHERE l.puuid = MatchParticipant.puuid AND l.queueType = 'RANKED_SOLO_5x5'")
+        print("Modified count:", cur.rowcount)
+
+    def select_champion_stats(self, queue_id: int = 420, patch: str = None) -> List[Dict[str, Any]]:
+        """Return games / wins per champion for `queue_id` (and `patch`), most played first."""
+        where, params = "queueId = ?", [queue_id]
+        if patch:
+            where += " AND patch = ?"
+            params.append(patch)
+        rows = self.conn.execute(
+            "SELECT championName, COUNT(*) AS games, SUM(win) AS wins "
+            f"FROM MatchParticipant WHERE {where} GROUP BY championName ORDER BY games DESC",
+            params).fetchall()
+        return [{'championName': r[0], 'games': r[1], 'wins': r[2]} for r in rows]
+
+    def iter_matches(self, batch_size: int = 1000, created_after: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Stream matches with slim participants: one ordered join, grouped per match, `batch_size` rows per fetch."""
+        match_columns = ('matchID', 'gameCreation', 'gameVersion', 'queueId', 'createdUtc')
+        where, params = ("WHERE m.createdUtc > ?", (created_after.isoformat(),)) if created_after else ("", ())
+        cur = self.conn.execute(
+            f"SELECT {', '.join('m.' + c for c in match_columns)}, {', '.join('p.' + c for c in PARTICIPANT_INDEX_FIELDS)} "
+            f"FROM Match m JOIN MatchParticipant p ON p.matchID = m.matchID {where} "
+            "ORDER BY m.matchID, p.participantId", params)
+        n = len(match_columns)
+
+        def rows():
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from batch
+
+        for _, group in itertools.groupby(rows(), key=lambda r: r[0]):
+            group = list(group)
+            match = dict(zip(match_columns, group[0][:n]))
+            match['participants'] = [dict(zip(PARTICIPANT_INDEX_FIELDS, r[n:])) for r in group]
+            for p in match['participants']:
+                p['win'] = bool(p['win']) if p['win'] is not None else None
+            yield match
+
+    def select_league_v4_by_puuids(self, puuids: List[str], queueType: str = 'RANKED_SOLO_5x5') -> Dict[str, Dict[str, Any]]:
+        columns = ('puuid', 'tier', 'rank', 'leaguePoints', 'wins', 'losses')
+        return {r[0]: dict(zip(columns, r)) for r in self._select_in_chunks(
+            f"SELECT {', '.join(columns)} FROM LeagueV4 WHERE queueType = ? AND puuid IN ({{keys}})", puuids, (queueType,))}
+
+    def select_tier_distribution(self, queueType: str = 'RANKED_SOLO_5x5', platform: str = None) -> List[Dict[str, Any]]:
+        """Players per tier / division of `queueType` (and `platform`)."""
+        where, params = "queueType = ?", [queueType]
+        if platform:
+            # same rule as select_oldest_ranked_puuids: untagged rows are NA1
+            where += " AND (platform = ? OR platform IS NULL)" if platform == DEFAULT_PLATFORM else " AND platform = ?"
+            params.append(platform)
+        rows = self.conn.execute(
+            f"SELECT tier, rank, COUNT(*) FROM LeagueV4 WHERE {where} GROUP BY tier, rank", params).fetchall()
+        return [{'tier': r[0], 'rank': r[1], 'players': r[2]} for r in rows]
+
+    def select_ingest_watermark(self) -> Dict[str, Any]:
+        """Latest Match createdUtc / LeagueV4 updateRankUtc, each one index lookup."""
+        matches, = self.conn.execute("SELECT MAX(createdUtc) FROM Match").fetchone()
+        leagues, = self.conn.execute("SELECT MAX(updateRankUtc) FROM LeagueV4").fetchone()
+        return {'matches': matches, 'leagues': leagues}
+
+    def select_all_matches(self) -> "pd.DataFrame":
+        """Return all rows from the `Match` table as a pandas DataFrame (participants are in MatchParticipant)."""
+        import pandas as pd     # analysis-only dependency, kept off the crawler import path
+        return pd.read_sql_query("SELECT * FROM Match", self.conn)
+
+    def time_select_matches(self) -> float:
+        start = time.perf_counter()
+        df = self.select_all_matches()
+        elapsed = time.perf_counter() - start
+        print(f"select_matches returned {df.shape[0]} rows in {elapsed:.3f} s")
+        print(df.head())
+        return elapsed
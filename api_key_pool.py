@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+from get_env_var import get_env_var
+from rate_limiter import RateLimiter
+
+# apikey.txt is what selenium_get_apikey_and_run_docker/selenium_get_apikey_to_file.py writes (next to itself by default)
+DEFAULT_API_KEY_FILES = ['apikey.txt', os.path.join('selenium_get_apikey_and_run_docker', 'apikey.txt')]
+RELOAD_SECs = 30
+
+def _mask(key: str) -> str:
+    return key[:10] + '...' + key[-4:] if len(key) > 16 else '***'
+
+class ApiKeyPool:
+    """Riot API keys the `API_*` modules draw from, each key with its own rate limit bucket per host.
+
+    Keys come from the `riotapikey` env var (comma separated) and from the key file(s): `apikeyfile`
+    env var or `DEFAULT_API_KEY_FILES`, one key per line. The files are re-read when they change
+    (checked every `reload_secs`), so a new key written by the selenium helper is picked up without
+    restarting the container. A key that gets a 401 is quarantined until it disappears from the sources.
+    If no usable key is left, `acquire` blocks until one shows up instead of failing.
+    """
+    def __init__(self, key_files: List[str] = None, reload_secs: float = RELOAD_SECs):
+        apikeyfile = get_env_var('apikeyfile')
+        self.key_files = key_files or ([apikeyfile] if apikeyfile else DEFAULT_API_KEY_FILES)
+        self.reload_secs = reload_secs
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._quarantined: Set[str] = set()
+        self._limiters: Dict[Tuple[str, str], RateLimiter] = {}
+        self._file_mtimes: Dict[str, float] = {}
+        self._last_check = 0.0
+        self.reload(force=True)
+
+    def _read_keys(self) -> List[str]:
+        keys = [k.strip() for k in get_env_var('riotapikey', '').split(',') if k.strip()]
+        for path in self.key_files:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    keys.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+            except OSError:
+                continue
+        return list(dict.fromkeys(keys))            # dedupe, keep order
+
+    def reload(self, force: bool = False):
+        """Re-read the key sources if a key file changed (or `force`)."""
+        mtimes = {}
+        for path in self.key_files:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+        with self._lock:
+            self._last_check = time.time()
+            if not force and mtimes == self._file_mtimes:
+                return
+            self._file_mtimes = mtimes
+            keys = self._read_keys()
+            added = [k for k in keys if k not in self._keys]
+            self._keys = keys
+            self._quarantined &= set(keys)          # forget keys that were removed from the sources
+        for key in added:
+            print("API key loaded:", _mask(key))
+
+    def active_keys(self) -> List[str]:
+        with self._lock:
+            return [k for k in self._keys if k not in self._quarantined]
+
+    def _limiter(self, host: str, key: str) -> RateLimiter:
+        with self._lock:
+            if (host, key) not in self._limiters:
+                self._limiters[(host, key)] = RateLimiter()
+            return self._limiters[(host, key)]
+
+    def acquire(self, host: str) -> str:
+        """Return a key with rate budget left on `host` (the one available soonest), blocking if needed."""
+        waiting_for_key = False
+        while True:
+            if time.time() - self._last_check > self.reload_secs:
+                self.reload()
+            keys = self.active_keys()
+            if not keys:
+                if not waiting_for_key:
+                    print(f"No valid API key. Waiting for a new key in {' / '.join(self.key_files)} ...")
+                    waiting_for_key = True
+                time.sleep(self.reload_secs)
+                self.reload()
+                continue
+
+            waits = sorted((self._limiter(host, k).time_until_available(), k) for k in keys)
+            wait_time, key = waits[0]
+            if wait_time <= 0 and self._limiter(host, key).try_acquire():
+                return key
+            if wait_time > (self._limiter(host, key).window_secs / 2):   # only print if waiting significant time to not flood output
+                print(f"Rate limit reached {host} for all {len(keys)} keys. Sleeping for {int(wait_time)} seconds...")
+            time.sleep(min(max(wait_time, 0.05), self.reload_secs))
+
+    def quarantine(self, key: str):
+        """Stop using `key` (401 Unauthorized: invalid / expired)."""
+        with self._lock:
+            if key in self._quarantined:
+                return
+            self._quarantined.add(key)
+            remaining = len([k for k in self._keys if k not in self._quarantined])
+        print(f"API key {_mask(key)} quarantined (unauthorized). {remaining} key(s) left")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_api_key_pool() -> ApiKeyPool:
+    """Shared pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ApiKeyPool()
+        return _pool
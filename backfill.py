@@ -0,0 +1,166 @@
+"""Historical backfill of one patch: the patch window is cut into time slices crawled in parallel.
+
+Usage:
+    python backfill.py --patch 15.23                                  # whole patch on NA1, 1 day slices
+    python backfill.py --patch 15.23 --platform EUW1 --slice-hours 12 --workers 4
+    python backfill.py --patch 15.24 --start 2025-12-05 --end 2025-12-07 --players-per-slice 500
+
+Each slice starts from the platform's known ranked players (`--seeds`, least recently crawled first) and
+explores breadth-first: a player's ranked solo games inside the slice are listed with matches-by-puuid
+`startTime` / `endTime`, games of the requested patch are stored like the live crawl does (participants'
+LeagueV4 included), and their participants are queued next. A player with no game inside the slice has left
+the window and is not explored further. A slice stops after `--players-per-slice` players.
+
+Progress is checkpointed per slice (spool dir `backfill/<platform>_<patch>/<slice>`: fetched payloads,
+the current player's matchIDs, and `slice.json` with the explored players / queue), so an interrupted
+backfill resumes where every slice left off. Finished slices are skipped on rerun.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import API_matches
+import DB_client
+from get_patch import get_patch
+from patch_windows import get_patch_window, split_window, parse_utc
+from region_router import normalize_platform
+from spool import Spool
+from start import process_matchIDs, replay_spooled_match, should_process_match
+
+class SliceState:
+    """`slice.json` of one slice: explored players, queue, counters. Written atomically after every player."""
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {'explored': [], 'queue': [], 'outOfWindow': 0, 'matches': 0, 'finished': False}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+def slice_name(start: datetime) -> str:
+    return start.strftime('%Y%m%dT%H%M')
+
+def backfill_slice(platform: str, patch: str, start: datetime, end: datetime, seeds: List[str],
+                   players_per_slice: int, DEBUG=False) -> Dict[str, Any]:
+    spool = Spool(name=os.path.join('backfill', f"{platform}_{patch}", slice_name(start)))
+    state = SliceState(os.path.join(spool.spool_dir, 'slice.json'))
+    s = state.state
+    try:
+        if s['finished']:
+            return s
+        spool.replay(replay_spooled_match)
+        if not s['explored'] and not s['queue']:
+            s['queue'] = list(seeds)
+        explored = set(s['explored'])
+        queued = set(s['queue'])
+        # players interrupted mid-list resume first
+        for puuid in spool.checkpointed_puuids():
+            if puuid not in queued:
+                s['queue'].insert(0, puuid)
+                queued.add(puuid)
+
+        def in_patch(match_json):
+            return should_process_match(match_json) and get_patch(match_json['info'].get('gameVersion')) == patch
+
+        while s['queue'] and len(explored) < players_per_slice:
+            puuid = s['queue'].pop(0)
+            queued.discard(puuid)
+            if puuid in explored:
+                continue
+            checkpoint = spool.get_checkpoint(puuid)
+            if checkpoint:
+                matchIDs_list = checkpoint['matchIDs']
+            else:
+                matchIDs_list = API_matches.get_all_matchIDs_by_puuid(puuid, platform, start_time=start, end_time=end, queue=420)
+            if matchIDs_list:
+                # stored games count too: the live crawl / an earlier backfill may have the slice already
+                persisted, participants = process_matchIDs(puuid, matchIDs_list, spool, platform, DEBUG, match_filter=in_patch,
+                                                           stored_participants=True)
+                s['matches'] += len(persisted)
+                room = players_per_slice - len(explored) - len(s['queue'])
+                for p in participants:
+                    if room <= 0:
+                        break
+                    if p not in explored and p not in queued:
+                        s['queue'].append(p)
+                        queued.add(p)
+                        room -= 1
+            else:
+                s['outOfWindow'] += 1                      # no game in this slice: don't explore from this player
+            spool.clear_checkpoint(puuid)
+            explored.add(puuid)
+            s['explored'].append(puuid)
+            state.save()
+            if DEBUG:
+                print(platform, patch, slice_name(start), 'explored:', len(explored), 'queue:', len(s['queue']),
+                      'matches:', s['matches'])
+        s['finished'] = True
+        state.save()
+        return s
+    finally:
+        spool.close()
+
+def backfill_patch(patch: str, platform: str = 'NA1', start: datetime = None, end: datetime = None, slice_hours: float = 24,
+                   workers: int = 4, seeds: int = 20, players_per_slice: int = 200, DEBUG=False) -> Dict[str, Any]:
+    """Backfill `patch` (optionally only [start, end) of it) with `workers` slices crawled concurrently."""
+    platform = normalize_platform(platform)
+    patch_start, patch_end = get_patch_window(patch)
+    patch = get_patch(patch) or patch
+    start = max(start or patch_start, patch_start)
+    end = min(end or patch_end or datetime.now(timezone.utc), patch_end or datetime.now(timezone.utc))
+    if start >= end:
+        raise ValueError(f"Empty window: patch {patch} runs {patch_start} - {patch_end}, requested {start} - {end}")
+    slices = split_window(start, end, slice_hours)
+
+    DB_client.get_db()                                          # connect once before the threads start
+    seed_puuids = DB_client.db.select_oldest_ranked_puuids(limit=seeds, platform=platform)
+    if not seed_puuids:
+        raise RuntimeError(f"No known ranked players on {platform} to start from; run the live crawl first")
+    print(f"backfilling {platform} patch {patch}: {start} - {end}, {len(slices)} slices, {workers} workers")
+
+    totals = {'slices': len(slices), 'explored': 0, 'outOfWindow': 0, 'matches': 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"backfill-{platform}") as pool:
+        futures = {pool.submit(backfill_slice, platform, patch, s, e, seed_puuids, players_per_slice, DEBUG): s
+                   for s, e in slices}
+        for future in futures:
+            s = future.result()
+            totals['explored'] += len(s['explored'])
+            totals['outOfWindow'] += s['outOfWindow']
+            totals['matches'] += s['matches']
+            print(f"slice {slice_name(futures[future])} done: {len(s['explored'])} players, {s['matches']} matches")
+    return totals
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--patch', required=True, help='ie. 15.23 (see patch_windows.py / patchwindows env var)')
+    p.add_argument('--platform', default='NA1')
+    p.add_argument('--start', type=parse_utc, help='UTC start inside the patch window, ie. 2025-11-20 or 2025-11-20T12:00')
+    p.add_argument('--end', type=parse_utc, help='UTC end inside the patch window')
+    p.add_argument('--slice-hours', type=float, default=24)
+    p.add_argument('--workers', type=int, default=4, help='slices crawled concurrently')
+    p.add_argument('--seeds', type=int, default=20, help='known ranked players each slice starts from')
+    p.add_argument('--players-per-slice', type=int, default=200)
+    p.add_argument('--debug', action='store_true')
+    args = p.parse_args(argv)
+
+    started = time.perf_counter()
+    totals = backfill_patch(args.patch, args.platform, args.start, args.end, args.slice_hours, args.workers,
+                            args.seeds, args.players_per_slice, args.debug)
+    print(f"backfill finished in {time.perf_counter() - started:.1f} s:", totals)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
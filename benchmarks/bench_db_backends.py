@@ -0,0 +1,110 @@
+"""Compare storage backends on crawl-style inserts and stat queries.
+
+Usage:
+    python benchmarks/bench_db_backends.py --matches 2000
+    python benchmarks/bench_db_backends.py --backends sqlite --matches 20000 --output bench_backends.json
+
+The SQLite backend runs against a throwaway file in a temp dir. The Mongo backend uses the server
+from the usual `dbserverandport` / `dbusr` / `dbpwd` env vars and a scratch database
+(`lol_analysis_bench`) that is dropped afterwards; it is skipped if the server is unreachable.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic_data
+from get_env_var import get_env_var
+
+BENCH_DATABASE = 'lol_analysis_bench'
+
+def open_backend(name, tmp_dir):
+    if name == 'sqlite':
+        from DB_client_sqlite import SQLiteDBClient
+        return SQLiteDBClient(os.path.join(tmp_dir, 'bench.db'))
+    if name == 'mongo':
+        from DB_client_mongo import MongoDBClient
+        db = MongoDBClient(get_env_var('dbserverandport'), get_env_var('dbusr'), get_env_var('dbpwd'), BENCH_DATABASE)
+        if not db.test_connection():
+            return None
+        db.client.drop_database(BENCH_DATABASE)
+        return db
+    raise ValueError(f"unknown backend '{name}'")
+
+def close_backend(name, db):
+    if name == 'mongo':
+        db.client.drop_database(BENCH_DATABASE)
+
+def time_queries(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {'repeat': repeat, 'seconds': round(elapsed, 4), 'per_sec': round(repeat / elapsed, 1) if elapsed else None}
+
+def bench_backend(db, n_matches, n_players, query_repeat):
+    puuids = synthetic_data.make_puuids(n_players)
+    leagues = {doc['puuid']: doc for doc in synthetic_data.make_leagues(puuids)}
+    matches = list(synthetic_data.iter_matches(n_matches, puuids))
+    result = {}
+
+    # same write pattern as start.py: 9 league merges + 1 match insert per transaction
+    start = time.perf_counter()
+    for match_json in matches:
+        session = db.begin_transaction()
+        try:
+            for participant in match_json['info']['participants'][1:]:
+                db.merge_league_v4_no_commit(leagues[participant['puuid']], session)
+            db.insert_match_no_commit(match_json['metadata']['matchId'], match_json['metadata']['dataVersion'],
+                                      match_json['info'], session)
+            db.commit_transaction(session)
+        finally:
+            db.close_transaction(session)
+    elapsed = time.perf_counter() - start
+    result['insert'] = {'matches': n_matches, 'seconds': round(elapsed, 3), 'matches_per_sec': round(n_matches / elapsed, 1)}
+
+    # 100 IDs, half of them already stored - the shape of a matches-by-puuid response
+    probe_ids = [m['metadata']['matchId'] for m in matches[:50]] + [f"NA1_{i}" for i in range(50)]
+    result['select_matches_in_list_not_in_table'] = time_queries(
+        lambda: db.select_matches_in_list_not_in_table(probe_ids), query_repeat)
+    result['select_oldest_ranked_puuids_df'] = time_queries(db.select_oldest_ranked_puuids_df, query_repeat)
+    result['select_champion_stats'] = time_queries(db.select_champion_stats, max(1, query_repeat // 10))
+    return result
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--backends', nargs='+', default=['sqlite', 'mongo'], choices=['sqlite', 'mongo'])
+    p.add_argument('--matches', type=int, default=2000)
+    p.add_argument('--players', type=int, default=5000)
+    p.add_argument('--query-repeat', type=int, default=200)
+    p.add_argument('--output', help='write results as JSON to this file')
+    args = p.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.backends:
+            try:
+                db = open_backend(name, tmp_dir)
+            except Exception as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            if db is None:
+                print(f"Skipping {name}: server unreachable")
+                continue
+            try:
+                results[name] = bench_backend(db, args.matches, args.players, args.query_repeat)
+            finally:
+                close_backend(name, db)
+            print(name, json.dumps(results[name], indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Micro-benchmarks of the DBClient methods the crawler relies on, at growing collection sizes.
+
+Usage:
+    python benchmarks/bench_db_layer.py --backends sqlite --sizes 10000 100000 --output bench_db_layer.json
+    python benchmarks/bench_db_layer.py --sizes 10000 100000 1000000           # sqlite + mongo (if reachable)
+    python benchmarks/bench_db_layer.py --sizes 10000 --baseline bench_db_layer.json --max-regression 0.25
+
+The database is seeded once per backend and grown size by size (10k -> 100k -> 1M synthetic matches built
+from `api_data_examples`), each operation being measured at every size:
+
+    select_matches_in_list_not_in_table   100 matchIDs, half of them stored (a matches-by-puuid page)
+    select_oldest_ranked_puuids_df        the crawler's work queue
+    merge_league_v4_no_commit             9 entries per transaction, unchanged (hash skip) and changed ranks
+    insert_match_no_commit                one new match per transaction (kept: the next size is seeded on top)
+    adhoc_league_v4_merge                 full pass, once per size (skip above --adhoc-max-matches)
+
+Per operation: latency (mean / p50 / p99 ms) and throughput over `--ops` calls, then one extra call under
+tracemalloc for the peak Python allocation, plus the process max RSS growth (getrusage) during the operation.
+
+SQLite runs against a temp file (the in-process stand-in for a server); Mongo uses the usual
+`dbserverandport` / `dbusr` / `dbpwd` env vars and the scratch database `lol_analysis_bench`, dropped afterwards.
+With `--baseline`, p50 latencies are compared to a previous result file and the exit code is 1 when
+any operation got slower than `--max-regression`.
+"""
+import argparse
+import json
+import os
+import platform as platform_info
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:         # Windows: no getrusage, RSS is reported as None
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic_data
+from bench_db_backends import open_backend, close_backend
+
+SEED_BATCH = 500
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss         # bytes on macOS, KiB on Linux
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+def measure(fn, ops, items_per_op=1):
+    """Time `ops` calls of `fn(i)`, then one more under tracemalloc for the peak allocation."""
+    rss_before = max_rss_kb()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(ops):
+        t = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(ops)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = max_rss_kb()
+
+    latencies.sort()
+    return {
+        'ops': ops,
+        'mean_ms': round(elapsed / ops * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'throughput_per_sec': round(ops * items_per_op / elapsed, 1) if elapsed else None,
+        'peak_alloc_kb': peak // 1024,
+        'max_rss_growth_kb': rss_after - rss_before if rss_before is not None else None,
+    }
+
+def in_transaction(db, fn):
+    session = db.begin_transaction()
+    try:
+        fn(session)
+        db.commit_transaction(session)
+    finally:
+        db.close_transaction(session)
+
+class Seeder:
+    """Grows the benchmark database to a target number of matches, keeping track of what is stored."""
+    def __init__(self, db, n_players, seed=0):
+        self.db = db
+        self.puuids = synthetic_data.make_puuids(n_players, seed)
+        self.leagues = synthetic_data.make_leagues(self.puuids, seed)
+        self.matches = 0
+        self.stored_ids = []            # a sample of stored matchIDs, for the "already stored" probes
+        self._next_game_id = 5_430_000_000
+        in_transaction(db, lambda s: db.merge_league_v4_no_commit(self.leagues, s))
+
+    def new_matches(self, n, seed):
+        matches = synthetic_data.iter_matches(n, self.puuids, seed=seed, first_game_id=self._next_game_id)
+        self._next_game_id += n
+        return matches
+
+    def grow_to(self, n_matches):
+        """Insert matches until `n_matches` are stored. Returns (matches inserted, seconds)."""
+        start, before = time.perf_counter(), self.matches
+        while self.matches < n_matches:
+            batch = list(self.new_matches(min(SEED_BATCH, n_matches - self.matches), seed=self.matches))
+
+            def insert(session):
+                for m in batch:
+                    self.db.insert_match_no_commit(m['metadata']['matchId'], m['metadata']['dataVersion'], m['info'], session)
+            in_transaction(self.db, insert)
+            self.matches += len(batch)
+            self.stored_ids.extend(m['metadata']['matchId'] for m in batch[::10])
+        return self.matches - before, time.perf_counter() - start
+
+def bench_size(db, seeder, ops, adhoc_max_matches):
+    rnd = random.Random(seeder.matches)
+    result = {}
+
+    def probe(i):
+        stored = rnd.sample(seeder.stored_ids, min(50, len(seeder.stored_ids)))
+        missing = [f"NA1_{4_000_000_000 + i * 100 + j}" for j in range(100 - len(stored))]
+        db.select_matches_in_list_not_in_table(stored + missing)
+    result['select_matches_in_list_not_in_table'] = measure(probe, ops)
+
+    try:
+        db.select_oldest_ranked_puuids_df()         # warm-up: the first call imports pandas
+        result['select_oldest_ranked_puuids_df'] = measure(lambda i: db.select_oldest_ranked_puuids_df(), ops)
+    except ImportError as e:
+        result['select_oldest_ranked_puuids_df'] = {'skipped': str(e)}
+
+    def merge(changed):
+        def run(i):
+            entries = rnd.sample(seeder.leagues, 9)
+            if changed:
+                entries = [dict(e, leaguePoints=(e['leaguePoints'] + 1 + i) % 100) for e in entries]
+            in_transaction(db, lambda s: db.merge_league_v4_no_commit(entries, s))
+        return run
+    result['merge_league_v4_no_commit_unchanged'] = measure(merge(False), ops, items_per_op=9)
+    result['merge_league_v4_no_commit_changed'] = measure(merge(True), ops, items_per_op=9)
+
+    new_matches = list(seeder.new_matches(ops + 1, seed=-seeder.matches))
+    def insert(i):
+        m = new_matches[i]
+        in_transaction(db, lambda s: db.insert_match_no_commit(m['metadata']['matchId'], m['metadata']['dataVersion'], m['info'], s))
+    result['insert_match_no_commit'] = measure(insert, ops)
+    seeder.matches += len(new_matches)
+
+    if adhoc_max_matches is None or seeder.matches <= adhoc_max_matches:
+        result['adhoc_league_v4_merge'] = measure(lambda i: db.adhoc_league_v4_merge(), 1, items_per_op=seeder.matches)
+    else:
+        result['adhoc_league_v4_merge'] = {'skipped': f"more than --adhoc-max-matches {adhoc_max_matches} matches"}
+    return result
+
+def compare(results, baseline, max_regression):
+    """Return the list of (backend, size, operation, baseline p50, p50) that regressed."""
+    regressions = []
+    for backend, sizes in results.get('results', {}).items():
+        for size, ops in sizes.items():
+            for op, r in ops.items():
+                base = baseline.get('results', {}).get(backend, {}).get(size, {}).get(op, {})
+                if 'p50_ms' in r and base.get('p50_ms') and r['p50_ms'] > base['p50_ms'] * (1 + max_regression):
+                    regressions.append((backend, size, op, base['p50_ms'], r['p50_ms']))
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--backends', nargs='+', default=['sqlite', 'mongo'], choices=['sqlite', 'mongo'])
+    p.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+    p.add_argument('--players', type=int, default=50_000)
+    p.add_argument('--ops', type=int, default=200, help='calls per operation and size')
+    p.add_argument('--adhoc-max-matches', type=int, default=None, help='skip adhoc_league_v4_merge above this size')
+    p.add_argument('--output', help='write results as JSON to this file')
+    p.add_argument('--baseline', help='previous --output file to compare p50 latencies against')
+    p.add_argument('--max-regression', type=float, default=0.25, help='allowed p50 slowdown vs baseline (0.25 = 25%%)')
+    args = p.parse_args(argv)
+
+    report = {
+        'python': platform_info.python_version(),
+        'platform': platform_info.platform(),
+        'players': args.players,
+        'ops': args.ops,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.backends:
+            try:
+                db = open_backend(name, tmp_dir)
+            except Exception as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            if db is None:
+                print(f"Skipping {name}: server unreachable")
+                continue
+            try:
+                seeder = Seeder(db, args.players)
+                backend_results = report['results'][name] = {}
+                for size in sorted(args.sizes):
+                    seeded, seed_secs = seeder.grow_to(size)
+                    print(f"{name}: seeded {seeder.matches} matches ({seed_secs:.1f} s)")
+                    backend_results[str(size)] = bench_size(db, seeder, args.ops, args.adhoc_max_matches)
+                    backend_results[str(size)]['seed'] = {'matches': seeded, 'seconds': round(seed_secs, 1),
+                                                          'throughput_per_sec': round(seeded / seed_secs, 1) if seed_secs else None}
+                    print(name, size, json.dumps(backend_results[str(size)], indent=2))
+            finally:
+                close_backend(name, db)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for backend, size, op, before, after in regressions:
+            print(f"REGRESSION {backend} {size} {op}: p50 {before} ms -> {after} ms")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Track cold-start (import) latency of the crawler entry point with `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --module start --runs 10 --top 15 --output bench_import.json
+
+Each run is a fresh interpreter (`python -X importtime -c "import <module>"`), so the numbers are what a
+container restart pays before the first API call. Reported: median / min / max cumulative import time of
+the module, and the slowest imports (median cumulative us) of the median run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(stderr):
+    """Return `{module: (self_us, cumulative_us)}` from `-X importtime` output."""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def run_once(module):
+    # a fresh process with no DB / API env side effects expected: importing must not connect anywhere
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--module', default='start')
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--top', type=int, default=10)
+    p.add_argument('--output', help='write results as JSON to this file')
+    args = p.parse_args(argv)
+
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    totals = [r[args.module][1] for r in runs]
+    median_run = sorted(runs, key=lambda r: r[args.module][1])[len(runs) // 2]
+    slowest = sorted(median_run.items(), key=lambda kv: kv[1][1], reverse=True)[:args.top]
+
+    result = {
+        'module': args.module,
+        'runs': args.runs,
+        'cumulative_us': {'median': statistics.median(totals), 'min': min(totals), 'max': max(totals)},
+        'slowest_imports': [{'module': name, 'self_us': s, 'cumulative_us': c} for name, (s, c) in slowest],
+    }
+    print(f"import {args.module}: median {result['cumulative_us']['median'] / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms) over {args.runs} runs")
+    for row in result['slowest_imports']:
+        print(f"  {row['cumulative_us'] / 1000:8.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
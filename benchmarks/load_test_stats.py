@@ -0,0 +1,148 @@
+"""Load test of the stats service: concurrent clients, p50 / p99 latency per endpoint.
+
+Usage:
+    python benchmarks/load_test_stats.py --url http://localhost:8080 --puuid <puuid> --clients 32 --seconds 20
+    python benchmarks/load_test_stats.py --self-hosted --matches 5000 --output load_stats.json
+
+`--self-hosted` seeds a throwaway SQLite database with synthetic matches and serves it in-process,
+so the service can be measured without a crawler database. Pass `--ingest-every 0.5` to keep inserting
+matches during the test (each insert moves the ingest watermark and invalidates cached match stats).
+`--no-etag` disables If-None-Match revalidation (every response carries a full body).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic_data
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+def insert_matches(db, matches):
+    for match_json in matches:
+        session = db.begin_transaction()
+        try:
+            db.insert_match_no_commit(match_json['metadata']['matchId'], match_json['metadata']['dataVersion'],
+                                      match_json['info'], session)
+            db.commit_transaction(session)
+        finally:
+            db.close_transaction(session)
+
+def start_self_hosted(n_matches, n_players):
+    """Seed a temp SQLite db and serve it on a free port. Returns (url, db, server, puuids)."""
+    from DB_client_sqlite import SQLiteDBClient
+    import stats_service
+    db = SQLiteDBClient(os.path.join(tempfile.mkdtemp(), 'stats.db'))
+    puuids = synthetic_data.make_puuids(n_players)
+    session = db.begin_transaction()
+    db.merge_league_v4_no_commit(synthetic_data.make_leagues(puuids), session)
+    db.commit_transaction(session)
+    db.close_transaction(session)
+    insert_matches(db, synthetic_data.iter_matches(n_matches, puuids))
+    server = stats_service.make_server(db, port=0, host='127.0.0.1')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", db, server, puuids
+
+def client_loop(url, paths, deadline, use_etag, results, lock, seed):
+    split = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(split.hostname, split.port or 80, timeout=30)
+    rnd = random.Random(seed)
+    etags = {}
+    local = []
+    while time.perf_counter() < deadline:
+        path = rnd.choice(paths)
+        headers = {'If-None-Match': etags[path]} if use_etag and path in etags else {}
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(split.hostname, split.port or 80, timeout=30)
+            local.append((path.split('?')[0].split('/')[1], None, 0))
+            continue
+        elapsed = time.perf_counter() - start
+        if response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+        local.append((path.split('?')[0].split('/')[1], response.status, elapsed))
+    conn.close()
+    with lock:
+        results.extend(local)
+
+def summarize(samples, seconds):
+    latencies = sorted(s[2] for s in samples if s[1] is not None)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'req_per_sec': round(len(samples) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+        'statuses': statuses,
+    }
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--url', default='http://localhost:8080')
+    p.add_argument('--puuid', action='append', default=[], help='player(s) for /players/<puuid>/history requests')
+    p.add_argument('--patch', default=None, help='patch for /champions requests, ie. 15.24')
+    p.add_argument('--clients', type=int, default=16)
+    p.add_argument('--seconds', type=float, default=10)
+    p.add_argument('--no-etag', action='store_true')
+    p.add_argument('--self-hosted', action='store_true')
+    p.add_argument('--matches', type=int, default=2000, help='--self-hosted: matches to seed')
+    p.add_argument('--players', type=int, default=1000, help='--self-hosted: player pool size')
+    p.add_argument('--ingest-every', type=float, default=0, help='--self-hosted: seconds between inserted matches')
+    p.add_argument('--output', help='write results as JSON to this file')
+    args = p.parse_args(argv)
+
+    url, stop_ingest = args.url, threading.Event()
+    if args.self_hosted:
+        url, db, server, puuids = start_self_hosted(args.matches, args.players)
+        args.puuid = args.puuid or puuids[:50]
+        if args.ingest_every > 0:
+            def ingest():
+                new_matches = synthetic_data.iter_matches(10**6, puuids, seed=1, first_game_id=6_000_000_000)
+                while not stop_ingest.wait(args.ingest_every):
+                    insert_matches(db, [next(new_matches)])
+            threading.Thread(target=ingest, daemon=True).start()
+
+    champion_path = '/champions' + (f"?patch={args.patch}" if args.patch else '')
+    paths = [champion_path, '/tiers'] + [f"/players/{p}/history" for p in args.puuid]
+
+    results, lock = [], threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=client_loop, args=(url, paths, deadline, not args.no_etag, results, lock, i))
+               for i in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop_ingest.set()
+
+    report = {'url': url, 'clients': args.clients, 'seconds': args.seconds, 'etag': not args.no_etag,
+              'all': summarize(results, args.seconds)}
+    for endpoint in sorted({s[0] for s in results}):
+        report[endpoint] = summarize([s for s in results if s[0] == endpoint], args.seconds)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Synthetic Match / LeagueV4 payloads for benchmarks, cloned from `api_data_examples`.
+
+Each generated match is a shallow variation of `match_example.json` (new matchId, gameCreation,
+participants drawn from a fixed puuid pool, shuffled champions and winner) so document sizes and
+shapes match what the crawler actually stores.
+"""
+import copy
+import json
+import os
+import random
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api_data_examples')
+
+# the 10 champions of match_example.json plus a few more so champion cardinality is not trivial
+CHAMPIONS = [
+    (86, 'Garen'), (950, 'Naafiri'), (7, 'Leblanc'), (202, 'Jhin'), (555, 'Pyke'), (14, 'Sion'),
+    (104, 'Graves'), (103, 'Ahri'), (21, 'MissFortune'), (89, 'Leona'), (1, 'Annie'), (22, 'Ashe'),
+    (51, 'Caitlyn'), (54, 'Malphite'), (64, 'LeeSin'), (67, 'Vayne'), (81, 'Ezreal'), (99, 'Lux'),
+    (122, 'Darius'), (145, 'Kaisa'), (157, 'Yasuo'), (238, 'Zed'), (266, 'Aatrox'), (412, 'Thresh'),
+]
+TIERS = ['IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND']
+RANKS = ['IV', 'III', 'II', 'I']
+
+def load_example(name):
+    with open(os.path.join(EXAMPLES_DIR, name), encoding='utf-8') as f:
+        return json.load(f)
+
+def make_puuids(n, seed=0):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_') for _ in range(78))
+            for _ in range(n)]
+
+def iter_matches(n, puuids, seed=0, first_game_id=5_430_000_000):
+    """Yield `n` match_json dicts (`{'metadata': ..., 'info': ...}`) built from match_example.json."""
+    template = load_example('match_example.json')
+    rnd = random.Random(seed)
+    base_creation = template['info']['gameCreation']
+    for i in range(n):
+        game_id = first_game_id + i
+        match_id = f"NA1_{game_id}"
+        info = dict(template['info'])
+        info['gameId'] = game_id
+        info['gameName'] = f"teambuilder-match-{game_id}"
+        info['gameCreation'] = base_creation + i * 60_000
+        info['gameStartTimestamp'] = info['gameCreation'] + 170_000
+        info['gameEndTimestamp'] = info['gameStartTimestamp'] + info['gameDuration'] * 1000
+        blue_win = rnd.random() < 0.5
+        players = rnd.sample(puuids, 10)
+        champions = rnd.sample(CHAMPIONS, 10)
+        participants = []
+        for p, puuid, (champion_id, champion_name) in zip(template['info']['participants'], players, champions):
+            p = dict(p)
+            p['puuid'] = puuid
+            p['championId'] = champion_id
+            p['championName'] = champion_name
+            p['win'] = blue_win if p['teamId'] == 100 else not blue_win
+            p['kills'] = rnd.randint(0, 15)
+            p['deaths'] = rnd.randint(0, 12)
+            p['assists'] = rnd.randint(0, 20)
+            participants.append(p)
+        info['participants'] = participants
+        yield {'metadata': {'dataVersion': template['metadata']['dataVersion'], 'matchId': match_id,
+                            'participants': players},
+               'info': info}
+
+def make_leagues(puuids, seed=0):
+    """Return one RANKED_SOLO_5x5 league entry per puuid, built from leagueV4_example.json."""
+    template = load_example('leagueV4_example.json')[0]
+    rnd = random.Random(seed)
+    leagues = []
+    for puuid in puuids:
+        doc = copy.copy(template)
+        doc['puuid'] = puuid
+        doc['tier'] = rnd.choice(TIERS)
+        doc['rank'] = rnd.choice(RANKS)
+        doc['leaguePoints'] = rnd.randint(0, 99)
+        doc['wins'] = rnd.randint(0, 300)
+        doc['losses'] = rnd.randint(0, 300)
+        leagues.append(doc)
+    return leagues
@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+from get_env_var import get_env_var
+
+DEFAULT_MAX_CONCURRENCY = 10        # one match = 9 participant league lookups fetched together
+LATENCY_EWMA_ALPHA = 0.2
+
+class AIMDController:
+    """Adaptive limit on in-flight API requests to one host (additive increase, multiplicative decrease). Thread safe.
+
+    Every successful request grows `window` by `increase / window` (ie. +1 per window of successes) as long as
+    the smoothed latency stays below `latency_factor` x the best latency seen lately; when latency degrades the
+    window holds. A 429 / 503 cuts it by `decrease`, at most once per `cooldown_secs` (default: one smoothed
+    request latency) so the burst of 429s coming back from one window counts once. Requests beyond the
+    window wait in `slot()`.
+    """
+    def __init__(self, initial_window=2.0, min_window=1.0, max_window=DEFAULT_MAX_CONCURRENCY, increase=1.0,
+                 decrease=0.5, latency_factor=2.0, cooldown_secs=None):
+        self.window = float(initial_window)
+        self.min_window = float(min_window)
+        self.max_window = float(max_window)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown_secs = cooldown_secs
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._latency_ewma = None
+        self._latency_floor = None
+        self._last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `window` request slots for the duration of the block."""
+        with self._cond:
+            while self._in_flight >= max(1, int(self.window)):
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def on_success(self, latency: float):
+        with self._cond:
+            self.successes += 1
+            if self._latency_ewma is None:
+                self._latency_ewma = self._latency_floor = latency
+            else:
+                self._latency_ewma += LATENCY_EWMA_ALPHA * (latency - self._latency_ewma)
+                # best recent latency: follows drops at once, rises slowly (server side latency changes over the day)
+                self._latency_floor = min(latency, self._latency_floor + 0.01 * (latency - self._latency_floor))
+            if self._latency_ewma <= self.latency_factor * self._latency_floor:
+                grown = min(self.max_window, self.window + self.increase / self.window)
+                if int(grown) > int(self.window):
+                    self._cond.notify()
+                self.window = grown
+
+    def on_throttle(self):
+        """429 Too Many Requests / 503 Service Unavailable: back off."""
+        with self._cond:
+            self.throttled += 1
+            now = time.monotonic()
+            cooldown = self.cooldown_secs if self.cooldown_secs is not None else (self._latency_ewma or 0.0)
+            if now - self._last_decrease >= cooldown:
+                self.window = max(self.min_window, self.window * self.decrease)
+                self._last_decrease = now
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'window': round(self.window, 2),
+                'inFlight': self._in_flight,
+                'latencyMs': round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+                'successes': self.successes,
+                'throttled': self.throttled,
+            }
+
+_controllers: Dict[str, AIMDController] = {}
+_controllers_lock = threading.Lock()
+
+def get_concurrency_controller(host: str) -> AIMDController:
+    """Shared controller of `host` (Riot limits are per routing value, ie. na1 / americas), created on first use.
+
+    `maxconcurrency` env var caps the window (default 10).
+    """
+    with _controllers_lock:
+        if host not in _controllers:
+            _controllers[host] = AIMDController(max_window=int(get_env_var('maxconcurrency', DEFAULT_MAX_CONCURRENCY)))
+        return _controllers[host]
+
+def concurrency_metrics() -> Dict[str, Dict[str, Any]]:
+    """`{host: {'window', 'inFlight', 'latencyMs', 'successes', 'throttled'}}` of every host used so far."""
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {host: c.metrics() for host, c in controllers.items()}
@@ -0,0 +1,316 @@
+"""Build fixed-dtype NumPy datasets (memory-mapped files) from stored matches for win prediction / draft analysis.
+
+Usage:
+    python dataset_builder.py data/dataset                    # build, or append matches stored since the last run
+    python dataset_builder.py data/dataset --workers 8 --chunk-size 2000
+
+Layout of the dataset directory (row i of every file is the same match):
+    features.i32     int32   (rows, 2, 5, len(FEATURE_FIELDS))   team (blue, red) x position (POSITIONS) x feature
+    labels.u1        uint8   (rows,)                             1 if the blue team (teamId 100) won
+    gameCreation.i64 int64   (rows,)                             ms since epoch, for time based train / test splits
+    matchIDs.txt     one matchID per row
+    manifest.json    row count, shapes, dtypes, feature / position / tier encodings, incremental watermark
+                     (+ the matchIDs created after it, the only ones a later run can read again)
+
+Load with `load_dataset(path)` (read-only memmaps, nothing is read into RAM until sliced).
+Missing values (unknown position, unranked player) are -1.
+Tier / LP are the players' current LeagueV4 state at build time, not their rank when the game was played.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+POSITIONS = ('TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY')
+TEAMS = (100, 200)
+TIERS = ('IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND', 'MASTER', 'GRANDMASTER', 'CHALLENGER')
+DIVISIONS = ('IV', 'III', 'II', 'I')
+FEATURE_FIELDS = ('championId', 'tier', 'division', 'leaguePoints', 'summoner1Id', 'summoner2Id')
+FEATURE_SHAPE = (len(TEAMS), len(POSITIONS), len(FEATURE_FIELDS))
+
+# (file name, dtype, per row shape)
+ARRAYS = (
+    ('features.i32', np.int32, FEATURE_SHAPE),
+    ('labels.u1', np.uint8, ()),
+    ('gameCreation.i64', np.int64, ()),
+)
+MANIFEST = 'manifest.json'
+MATCH_IDS = 'matchIDs.txt'
+# matches committed while a run is reading may carry a slightly older createdUtc than the newest one seen
+WATERMARK_MARGIN = timedelta(minutes=10)
+
+_TIER_INDEX = {t: i for i, t in enumerate(TIERS)}
+_DIVISION_INDEX = {d: i for i, d in enumerate(DIVISIONS)}
+_POSITION_INDEX = {p: i for i, p in enumerate(POSITIONS)}
+_TEAM_INDEX = {t: i for i, t in enumerate(TEAMS)}
+
+def extract_features(matches: List[Dict[str, Any]], leagues: Dict[str, Dict[str, Any]]):
+    """Feature rows of a chunk of matches (runs in the worker processes).
+
+    Returns (matchIDs, features, labels, gameCreation); matches without a full 5v5 of known positions are dropped.
+    """
+    matchIDs = []
+    features = np.full((len(matches),) + FEATURE_SHAPE, -1, dtype=np.int32)
+    labels = np.zeros(len(matches), dtype=np.uint8)
+    game_creation = np.zeros(len(matches), dtype=np.int64)
+    row = 0
+    for match in matches:
+        seen = 0
+        blue_win = None
+        for p in match.get('participants') or []:
+            team = _TEAM_INDEX.get(p.get('teamId'))
+            position = _POSITION_INDEX.get(p.get('teamPosition'))
+            if team is None or position is None:
+                continue
+            league = leagues.get(p.get('puuid')) or {}
+            features[row, team, position] = (
+                p.get('championId') or -1,
+                _TIER_INDEX.get(league.get('tier'), -1),
+                _DIVISION_INDEX.get(league.get('rank'), -1),
+                league.get('leaguePoints', -1) if league else -1,
+                p.get('summoner1Id') or -1,
+                p.get('summoner2Id') or -1,
+            )
+            if team == 0:
+                blue_win = bool(p.get('win'))
+            seen += 1
+        if seen != len(TEAMS) * len(POSITIONS) or blue_win is None:
+            features[row] = -1                                  # remake / missing positions: row gets reused
+            continue
+        labels[row] = blue_win
+        game_creation[row] = match.get('gameCreation') or 0
+        matchIDs.append(match['matchID'])
+        row += 1
+    return matchIDs, features[:row], labels[:row], game_creation[:row]
+
+def _as_utc(value) -> Optional[datetime]:
+    """createdUtc as stored (Mongo: naive UTC datetime, SQLite: ISO string) -> aware UTC datetime."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class MatchIDLog:
+    """`matchIDs.txt` of an incrementally built directory + the matchIDs a run must not add again.
+
+    An incremental run reads the matches created after the manifest watermark, so only matchIDs created
+    after it can come back: those are kept in the manifest (`recentMatchIDs`), plus the lines appended
+    since the watermark was set (a run interrupted after an intermediate commit). Memory stays bounded by
+    one run, not by the size of the directory. The manifest stores the committed length of the file;
+    lines past it (crash before the manifest was written) are cut off on open.
+    """
+    def __init__(self, path: str, manifest: Dict[str, Any], count: int):
+        self.path = os.path.join(path, MATCH_IDS)
+        self.manifest = manifest
+        self.count = count
+        committed = manifest.get('matchIDsBytes')
+        if committed is None:                              # new directory / manifest from before matchIDsBytes
+            committed = 0
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    for _, line in zip(range(count), f):
+                        committed += len(line)
+        with open(self.path, 'ab') as f:
+            f.truncate(committed)
+        self.bytes = committed
+        self.seen = set(manifest.get('recentMatchIDs') or {})
+        with open(self.path, 'rb') as f:
+            f.seek(manifest.get('watermarkBytes', 0))
+            self.seen.update(line.decode('utf-8').rstrip('\n') for line in f)
+        self.recent: Dict[str, str] = {}
+
+    def __contains__(self, matchID: str) -> bool:
+        return matchID in self.seen
+
+    def note(self, match: Dict[str, Any], cutoff: datetime):
+        """Remember a match read by this run if the next run can read it again (created after `cutoff`)."""
+        created = _as_utc(match.get('createdUtc'))
+        if created is not None and created > cutoff:
+            self.recent[match['matchID']] = created.isoformat()
+
+    def append(self, matchIDs: List[str]):
+        data = ''.join(m + '\n' for m in matchIDs).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.bytes += len(data)
+        self.count += len(matchIDs)
+
+    def manifest_fields(self, watermark: datetime = None) -> Dict[str, Any]:
+        """Fields to store with the manifest; with the new `watermark` of a finished run."""
+        fields = {'matchIDsBytes': self.bytes}
+        if watermark is not None:
+            fields['watermarkBytes'] = self.bytes
+            fields['recentMatchIDs'] = {m: c for m, c in self.recent.items() if datetime.fromisoformat(c) > watermark}
+        return fields
+
+class DatasetWriter:
+    """Appends rows to the memory-mapped arrays of a dataset directory, growing the files in steps."""
+    def __init__(self, path: str, grow_rows: int = 100_000):
+        self.path = path
+        self.grow_rows = grow_rows
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self.rows = self.manifest['rows']
+        self.matchIDs = MatchIDLog(path, self.manifest, self.rows)
+        self._maps = {}
+        self._capacity = 0
+        self._remap(max(self.rows, 1))
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.path, MANIFEST), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'rows': 0, 'watermark': None}
+        if manifest.get('feature_fields') != list(FEATURE_FIELDS) or manifest.get('positions') != list(POSITIONS):
+            raise ValueError(f"Dataset at {self.path} was built with a different feature layout; build into a new directory")
+        return manifest
+
+    def _remap(self, capacity: int):
+        self.flush()
+        self._maps = {}
+        for name, dtype, shape in ARRAYS:
+            file_path = os.path.join(self.path, name)
+            size = capacity * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            with open(file_path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._maps[name] = np.memmap(file_path, dtype=dtype, mode='r+', shape=(capacity,) + shape)
+        self._capacity = capacity
+
+    def append(self, matchIDs: List[str], features: np.ndarray, labels: np.ndarray, game_creation: np.ndarray):
+        keep = [i for i, m in enumerate(matchIDs) if m not in self.matchIDs]    # an earlier run may have had it
+        if not keep:
+            return 0
+        if len(keep) != len(matchIDs):
+            matchIDs = [matchIDs[i] for i in keep]
+            features, labels, game_creation = features[keep], labels[keep], game_creation[keep]
+        n = len(matchIDs)
+        if self.rows + n > self._capacity:
+            self._remap(self.rows + n + self.grow_rows)
+        end = self.rows + n
+        self._maps['features.i32'][self.rows:end] = features
+        self._maps['labels.u1'][self.rows:end] = labels
+        self._maps['gameCreation.i64'][self.rows:end] = game_creation
+        self.matchIDs.append(matchIDs)
+        self.rows = end
+        return n
+
+    def flush(self):
+        for m in self._maps.values():
+            m.flush()
+
+    def commit(self, watermark: datetime = None):
+        """Flush the arrays, then write the manifest (the manifest row count is what readers trust)."""
+        self.flush()
+        self.manifest.update({
+            'rows': self.rows,
+            'feature_shape': list(FEATURE_SHAPE),
+            'feature_fields': list(FEATURE_FIELDS),
+            'positions': list(POSITIONS),
+            'teams': list(TEAMS),
+            'tiers': list(TIERS),
+            'divisions': list(DIVISIONS),
+            'arrays': {name: {'dtype': np.dtype(dtype).name, 'shape': list(shape)} for name, dtype, shape in ARRAYS},
+            'updatedUtc': datetime.now(timezone.utc).isoformat(),
+        })
+        self.manifest.update(self.matchIDs.manifest_fields(watermark))
+        if watermark is not None:
+            self.manifest['watermark'] = watermark.isoformat()
+        tmp_path = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+def build_dataset(db, path: str, workers: int = None, chunk_size: int = 1000, commit_every: int = 50):
+    """Append every stored match not yet in the dataset at `path`. Memory stays bounded by
+    `chunk_size` x (workers x 2 in-flight chunks), independent of the number of matches.
+    """
+    writer = DatasetWriter(path)
+    watermark = writer.manifest.get('watermark')
+    created_after = datetime.fromisoformat(watermark) if watermark else None
+    run_started = datetime.now(timezone.utc)
+    new_watermark = run_started - WATERMARK_MARGIN
+    workers = os.cpu_count() if workers is None else workers
+    added, chunks_done = 0, 0
+
+    def chunks():
+        chunk = []
+        for match in db.iter_matches(batch_size=chunk_size, created_after=created_after):
+            writer.matchIDs.note(match, new_watermark)
+            if match['matchID'] not in writer.matchIDs:
+                chunk.append(match)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def with_leagues(chunk):
+        puuids = {p.get('puuid') for m in chunk for p in m.get('participants') or []}
+        return chunk, db.select_league_v4_by_puuids(puuids)
+
+    def write(result):
+        nonlocal added, chunks_done
+        added += writer.append(*result)
+        chunks_done += 1
+        if chunks_done % commit_every == 0:
+            writer.commit()
+            print(f"dataset rows: {writer.rows} (+{added})")
+
+    if workers <= 0:
+        for chunk in chunks():
+            write(extract_features(*with_leagues(chunk)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = []
+            for chunk in chunks():
+                in_flight.append(pool.submit(extract_features, *with_leagues(chunk)))
+                while len(in_flight) >= workers * 2:                 # bounded: RAM does not grow with the match count
+                    write(in_flight.pop(0).result())
+            for future in in_flight:
+                write(future.result())
+
+    writer.commit(watermark=new_watermark)
+    return added
+
+def load_dataset(path: str) -> Dict[str, Any]:
+    """Open a dataset read-only: `{'features', 'labels', 'gameCreation'}` memmaps plus `matchIDs` and `manifest`."""
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    rows = manifest['rows']
+    dataset = {'manifest': manifest}
+    for name, dtype, shape in ARRAYS:
+        key = name.split('.')[0]
+        dataset[key] = np.memmap(os.path.join(path, name), dtype=dtype, mode='r', shape=(rows,) + shape) if rows else \
+            np.zeros((0,) + shape, dtype=dtype)
+    with open(os.path.join(path, MATCH_IDS), encoding='utf-8') as f:
+        dataset['matchIDs'] = [line.rstrip('\n') for _, line in zip(range(rows), f)]
+    return dataset
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('path', help='dataset directory (created if missing)')
+    p.add_argument('--workers', type=int, default=None, help='feature extraction processes (default: cpu count, 0: in process)')
+    p.add_argument('--chunk-size', type=int, default=1000, help='matches per worker task')
+    args = p.parse_args(argv)
+
+    import DB_client
+    start = time.perf_counter()
+    added = build_dataset(DB_client.db, args.path, args.workers, args.chunk_size)
+    print(f"added {added} matches to {args.path} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
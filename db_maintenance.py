@@ -0,0 +1,48 @@
+"""One-off maintenance jobs against the database configured by the usual env vars (see README.txt).
+
+Usage:
+    python db_maintenance.py backfill-participants [--batch-size 1000]
+    python db_maintenance.py split-cold [--batch-size 1000]
+    python db_maintenance.py rebuild-player-summaries [--batch-size 1000]
+"""
+import argparse
+import sys
+import time
+import DB_client
+
+def backfill_participants(args):
+    """Index the participants of matches stored before the MatchParticipant index existed."""
+    DB_client.db.backfill_participant_index(batch_size=args.batch_size)
+
+def split_cold(args):
+    """Move perks / missions still embedded in Match documents to the compressed MatchCold store."""
+    DB_client.db.backfill_match_cold(batch_size=args.batch_size)
+
+def rebuild_player_summaries(args):
+    """Recompute every PlayerSummary from the MatchParticipant index (matches stored before it existed, repairs)."""
+    DB_client.db.rebuild_player_summaries(batch_size=args.batch_size)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest='command', required=True)
+
+    backfill = sub.add_parser('backfill-participants', help=backfill_participants.__doc__)
+    backfill.add_argument('--batch-size', type=int, default=1000)
+    backfill.set_defaults(func=backfill_participants)
+
+    cold = sub.add_parser('split-cold', help=split_cold.__doc__)
+    cold.add_argument('--batch-size', type=int, default=1000)
+    cold.set_defaults(func=split_cold)
+
+    summaries = sub.add_parser('rebuild-player-summaries', help=rebuild_player_summaries.__doc__)
+    summaries.add_argument('--batch-size', type=int, default=1000)
+    summaries.set_defaults(func=rebuild_player_summaries)
+
+    args = p.parse_args(argv)
+    start = time.perf_counter()
+    args.func(args)
+    print(f"{args.command} finished in {time.perf_counter() - start:.1f} s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
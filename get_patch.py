@@ -0,0 +1,11 @@
+def get_patch(game_version):
+    """Return the patch (`major.minor`) of a match `gameVersion`, ie. '15.24.730.7955' -> '15.24'.
+
+    Returns None for a missing / malformed version.
+    """
+    if not game_version:
+        return None
+    parts = str(game_version).split('.')
+    if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    return parts[0] + '.' + parts[1]
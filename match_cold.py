@@ -0,0 +1,70 @@
+import json
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+# bulky participant fields that are rarely queried: kept out of the hot Match working set and stored
+# compressed, one blob per match, in the MatchCold collection / table
+COLD_PARTICIPANT_FIELDS = ('challenges', 'perks', 'missions')
+
+def split_cold_participants(match_info_json: Dict[str, Any]) -> Tuple[list, Dict[str, Dict[str, Any]]]:
+    """Return (participants without the cold fields, `{puuid: {field: value}}` of the cold fields)."""
+    hot, cold = [], {}
+    for p in match_info_json.get('participants') or []:
+        if not isinstance(p, dict):
+            hot.append(p)
+            continue
+        hot.append({k: v for k, v in p.items() if k not in COLD_PARTICIPANT_FIELDS})
+        cold_fields = {k: p[k] for k in COLD_PARTICIPANT_FIELDS if k in p}
+        if cold_fields:
+            cold[p.get('puuid') or str(p.get('participantId'))] = cold_fields
+    return hot, cold
+
+def pack_cold(cold: Dict[str, Dict[str, Any]]) -> Tuple[str, bytes]:
+    """Compress the cold data of a match. Returns (codec, blob); zstd if installed, else zlib."""
+    raw = json.dumps(cold, separators=(',', ':')).encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=9).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+def unpack_cold(codec: str, blob: bytes) -> Dict[str, Dict[str, Any]]:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read zstd compressed cold data. Install with 'pip install zstandard'.")
+        raw = zstandard.ZstdDecompressor().decompress(bytes(blob))
+    elif codec == 'zlib':
+        raw = zlib.decompress(bytes(blob))
+    else:
+        raise ValueError(f"Unknown cold data codec '{codec}'")
+    return json.loads(raw)
+
+class LazyMatchCold:
+    """Cold participant data (challenges / perks / missions) of one match, loaded on first access.
+
+    Example:
+        cold = LazyMatchCold(DB_client.db, matchID)
+        cold[puuid]['challenges']['kda']         # only now is MatchCold read and decompressed
+    """
+    def __init__(self, db, matchID: str):
+        self.db = db
+        self.matchID = matchID
+        self._data: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        if self._data is None:
+            self._data = self.db.select_match_cold(self.matchID)
+        return self._data
+
+    def __getitem__(self, puuid: str) -> Dict[str, Any]:
+        return self.load()[puuid]
+
+    def get(self, puuid: str, default=None):
+        return self.load().get(puuid, default)
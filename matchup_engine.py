@@ -0,0 +1,370 @@
+"""Champion lane matchup / same-team synergy win rates as dense NumPy matrices, per patch and tier.
+
+Usage:
+    python matchup_engine.py data/matchups                    # build, or add matches stored since the last run
+    python matchup_engine.py data/matchups --rebuild          # recount everything from the stored matches
+
+Layout of the matchup directory:
+    <patch>/matchup_games.<g>.npy   int32  (tiers, positions, champions, champions)  games of champion a vs b in that lane
+    <patch>/matchup_wins.<g>.npy    int32  (tiers, positions, champions, champions)  games of those won by a
+    <patch>/synergy_games.<g>.npy   int32  (tiers, champions, champions)             games with a and b on the same team
+    <patch>/synergy_wins.<g>.npy    int32  (tiers, champions, champions)             games of those won (symmetric)
+    matchIDs.txt                    one counted matchID per line (a match is never counted twice)
+    manifest.json                   generation <g> of each patch's files, championId -> index encoding, tiers,
+                                    positions, incremental watermark, committed length of matchIDs.txt
+
+A commit writes the touched patches as a new generation of files and then swaps in the manifest that points
+at them together with the new length of matchIDs.txt, so counts and counted matchIDs change atomically;
+files of older generations are deleted afterwards.
+
+Champions are indexed densely in order of first appearance (`manifest['champions'][i]` is the championId of
+index i); the matrices grow when a new champion shows up. Tiers are TIERS of dataset_builder.py plus UNRANKED;
+a match's tier is the median current LeagueV4 tier of its ranked players. Only full 5v5 games with known
+positions are counted. Counting is done with `np.bincount` over flattened (tier, position, a, b) indices, a
+few array operations per batch of matches instead of Python loops over participant pairs.
+
+Queries (`MatchupMatrices.load(path)`, arrays opened memory-mapped) are array lookups:
+    matchup(a, b, position, patch)    counters(champion, position, patch)
+    synergy(a, b, patch)              best_duos(champion, patch)
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from dataset_builder import POSITIONS, TIERS, WATERMARK_MARGIN, MatchIDLog, extract_features
+from get_patch import get_patch
+
+MATCHUP_TIERS = TIERS + ('UNRANKED',)
+MANIFEST = 'manifest.json'
+CHAMPION_GROW = 32                  # matrices grow by this many champions at a time
+MATRICES = ('matchup_games', 'matchup_wins', 'synergy_games', 'synergy_wins')
+
+_POSITION_INDEX = {p: i for i, p in enumerate(POSITIONS)}
+_TIER_INDEX = {t: i for i, t in enumerate(MATCHUP_TIERS)}
+# the 10 same-team champion pairs of a 5 player team
+_PAIR_I, _PAIR_J = np.triu_indices(len(POSITIONS), k=1)
+
+def _matrix_path(path: str, patch: str, name: str, generation: int) -> str:
+    return os.path.join(path, patch, f"{name}.{generation}.npy")
+
+def _matrix_shape(name: str, champions: int) -> tuple:
+    if name.startswith('matchup'):
+        return (len(MATCHUP_TIERS), len(POSITIONS), champions, champions)
+    return (len(MATCHUP_TIERS), champions, champions)
+
+def match_tiers(tiers: np.ndarray) -> np.ndarray:
+    """(rows, 10) tier indices of the players (-1 unranked) -> (rows,) tier index of each match."""
+    ranked = np.where(tiers >= 0, tiers, np.nan).astype(np.float64)
+    has_ranked = ~np.all(np.isnan(ranked), axis=1)
+    median = np.zeros(len(tiers))
+    if has_ranked.any():
+        median[has_ranked] = np.nanmedian(ranked[has_ranked], axis=1)
+    return np.where(has_ranked, np.floor(median), _TIER_INDEX['UNRANKED']).astype(np.int64)
+
+def count_matches(champions: np.ndarray, blue_win: np.ndarray, tiers: np.ndarray, n_champions: int) -> Dict[str, np.ndarray]:
+    """Matchup / synergy counts of a batch of matches of one patch.
+
+    `champions` (rows, 2, 5) dense champion indices (team blue / red x POSITIONS), `blue_win` (rows,) bool,
+    `tiers` (rows,) match tier indices. Returns arrays shaped like the stored matrices.
+    """
+    counts = {}
+    blue, red = champions[:, 0, :], champions[:, 1, :]
+    win = blue_win[:, None].astype(bool)
+    tier = np.broadcast_to(tiers[:, None], blue.shape)
+    position = np.broadcast_to(np.arange(len(POSITIONS)), blue.shape)
+
+    shape = _matrix_shape('matchup', n_champions)
+    size = int(np.prod(shape))
+    # every lane counted from both sides: (blue vs red) and (red vs blue)
+    as_blue = np.ravel_multi_index((tier, position, blue, red), shape)
+    as_red = np.ravel_multi_index((tier, position, red, blue), shape)
+    counts['matchup_games'] = (np.bincount(as_blue.ravel(), minlength=size) +
+                               np.bincount(as_red.ravel(), minlength=size)).reshape(shape)
+    counts['matchup_wins'] = (np.bincount(as_blue[np.broadcast_to(win, blue.shape)], minlength=size) +
+                              np.bincount(as_red[np.broadcast_to(~win, red.shape)], minlength=size)).reshape(shape)
+
+    shape = _matrix_shape('synergy', n_champions)
+    size = int(np.prod(shape))
+    games = np.zeros(size, dtype=np.int64)
+    wins = np.zeros(size, dtype=np.int64)
+    pair_tier = np.broadcast_to(tiers[:, None], (len(tiers), len(_PAIR_I)))
+    for team, team_won in ((blue, win), (red, ~win)):
+        a, b = team[:, _PAIR_I], team[:, _PAIR_J]
+        team_won = np.broadcast_to(team_won, a.shape)
+        for x, y in ((a, b), (b, a)):                       # stored symmetric: lookups need no ordering
+            idx = np.ravel_multi_index((pair_tier, x, y), shape)
+            games += np.bincount(idx.ravel(), minlength=size)
+            wins += np.bincount(idx[team_won], minlength=size)
+    counts['synergy_games'] = games.reshape(shape)
+    counts['synergy_wins'] = wins.reshape(shape)
+    return counts
+
+class MatchupWriter:
+    """In-memory matrices of the patches touched by a run, saved as `.npy` files on `commit`."""
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self.champions: List[int] = self.manifest['champions']
+        self.champion_names: Dict[str, str] = self.manifest.get('championNames', {})
+        self._champion_index = {c: i for i, c in enumerate(self.champions)}
+        self.capacity = self.manifest.get('capacity', 0)
+        self.matchIDs = MatchIDLog(path, self.manifest, self.manifest.get('matches', 0))
+        self._patches: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.path, MANIFEST), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'champions': [], 'patches': {}, 'generation': 0, 'watermark': None}
+        if manifest.get('tiers') != list(MATCHUP_TIERS) or manifest.get('positions') != list(POSITIONS) or \
+                not isinstance(manifest.get('patches'), dict):
+            raise ValueError(f"Matchups at {self.path} were built with a different tier / position layout; use --rebuild")
+        return manifest
+
+    def champion_indices(self, champion_ids: np.ndarray, names: Dict[int, str]) -> np.ndarray:
+        """Dense indices of `champion_ids`, registering unseen champions (grows every matrix if needed)."""
+        for c in np.unique(champion_ids).tolist():
+            if c not in self._champion_index:
+                self._champion_index[c] = len(self.champions)
+                self.champions.append(c)
+                if c in names:
+                    self.champion_names[str(c)] = names[c]
+        if len(self.champions) > self.capacity:
+            self.capacity = len(self.champions) + CHAMPION_GROW
+            for patch in self._patches:
+                self._patches[patch] = {name: self._grow(m, name) for name, m in self._patches[patch].items()}
+        lookup = np.zeros(max(self._champion_index) + 1, dtype=np.int64)
+        lookup[list(self._champion_index)] = list(self._champion_index.values())
+        return lookup[champion_ids]
+
+    def _grow(self, matrix: np.ndarray, name: str) -> np.ndarray:
+        grown = np.zeros(_matrix_shape(name, self.capacity), dtype=np.int32)
+        c = matrix.shape[-1]
+        grown[..., :c, :c] = matrix
+        return grown
+
+    def matrices(self, patch: str) -> Dict[str, np.ndarray]:
+        if patch not in self._patches:
+            if patch in self.manifest['patches']:
+                generation = self.manifest['patches'][patch]
+                self._patches[patch] = {name: self._grow(np.load(_matrix_path(self.path, patch, name, generation)), name)
+                                        for name in MATRICES}
+            else:
+                self._patches[patch] = {name: np.zeros(_matrix_shape(name, self.capacity), dtype=np.int32)
+                                        for name in MATRICES}
+        return self._patches[patch]
+
+    def add(self, patch: str, matchIDs: List[str], counts: Dict[str, np.ndarray]):
+        matrices = self.matrices(patch)
+        for name, c in counts.items():
+            n = c.shape[-1]
+            matrices[name][..., :n, :n] += c.astype(np.int32)
+        self.matchIDs.append(matchIDs)          # past the manifest's committed length until `commit`
+
+    def commit(self, watermark: datetime = None):
+        """Write the touched patches as a new generation (fsync'd), then swap in the manifest pointing at them."""
+        generation = self.manifest.get('generation', 0) + 1
+        for patch, matrices in self._patches.items():
+            os.makedirs(os.path.join(self.path, patch), exist_ok=True)
+            for name, m in matrices.items():
+                with open(_matrix_path(self.path, patch, name, generation), 'wb') as f:
+                    np.save(f, m)
+                    f.flush()
+                    os.fsync(f.fileno())
+        self.manifest.update({
+            'generation': generation,
+            'patches': dict(self.manifest['patches'], **{patch: generation for patch in self._patches}),
+            'champions': self.champions,
+            'championNames': self.champion_names,
+            'capacity': self.capacity,
+            'tiers': list(MATCHUP_TIERS),
+            'positions': list(POSITIONS),
+            'matches': self.matchIDs.count,
+            'updatedUtc': datetime.now(timezone.utc).isoformat(),
+        })
+        self.manifest.update(self.matchIDs.manifest_fields(watermark))
+        if watermark is not None:
+            self.manifest['watermark'] = watermark.isoformat()
+        tmp_path = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+        # older generations, and files of a commit that crashed before its manifest was written
+        for patch, current in self.manifest['patches'].items():
+            keep = {os.path.basename(_matrix_path(self.path, patch, name, current)) for name in MATRICES}
+            for file_name in os.listdir(os.path.join(self.path, patch)):
+                if file_name.endswith('.npy') and file_name not in keep:
+                    os.remove(os.path.join(self.path, patch, file_name))
+
+def build_matchups(db, path: str, rebuild: bool = False, chunk_size: int = 5000) -> int:
+    """Count every stored match not yet in the matrices at `path` (all of them with `rebuild`).
+
+    A rebuild is written to `<path>.rebuild` and swapped in when complete, so readers never see partial counts.
+    """
+    target = path
+    if rebuild:
+        path = path.rstrip('/\\') + '.rebuild'
+        shutil.rmtree(path, ignore_errors=True)
+    writer = MatchupWriter(path)
+    watermark = writer.manifest.get('watermark')
+    created_after = datetime.fromisoformat(watermark) if watermark else None
+    new_watermark = datetime.now(timezone.utc) - WATERMARK_MARGIN
+    added = 0
+
+    def chunks():
+        chunk = []
+        for match in db.iter_matches(batch_size=chunk_size, created_after=created_after):
+            writer.matchIDs.note(match, new_watermark)
+            if match['matchID'] not in writer.matchIDs:
+                chunk.append(match)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    for chunk in chunks():
+        puuids = {p.get('puuid') for m in chunk for p in m.get('participants') or []}
+        matchIDs, features, labels, _ = extract_features(chunk, db.select_league_v4_by_puuids(puuids))
+        known = np.all(features[..., 0] > 0, axis=(1, 2))          # a participant without championId: skip the game
+        if not known.all():
+            matchIDs = [m for m, k in zip(matchIDs, known) if k]
+            features, labels = features[known], labels[known]
+        if not matchIDs:
+            continue
+        names = {p.get('championId'): p.get('championName') for m in chunk for p in m.get('participants') or []}
+        champions = writer.champion_indices(features[..., 0], names)
+        tiers = match_tiers(features[..., 1].reshape(len(matchIDs), -1))
+        patch_of = {m['matchID']: get_patch(m.get('gameVersion')) or 'unknown' for m in chunk}
+        patches = np.array([patch_of[m] for m in matchIDs], dtype=object)
+        ids = np.array(matchIDs, dtype=object)
+        for patch in np.unique(patches).tolist():
+            rows = patches == patch
+            counts = count_matches(champions[rows], labels[rows].astype(bool), tiers[rows], writer.capacity)
+            writer.add(patch, ids[rows].tolist(), counts)
+        added += len(matchIDs)
+        print(f"matchups: {writer.matchIDs.count} matches (+{added})")
+
+    writer.commit(watermark=new_watermark)
+    if rebuild:
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(path, target)
+    return added
+
+class MatchupMatrices:
+    """Read-only view of a matchup directory; every query is an index into the memory-mapped matrices."""
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.champions = manifest['champions']
+        self.champion_names = {int(c): n for c, n in manifest.get('championNames', {}).items()}
+        self._champion_index = {c: i for i, c in enumerate(self.champions)}
+        self._patches: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'MatchupMatrices':
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            return cls(path, json.load(f))
+
+    def _matrices(self, patch: str) -> Dict[str, np.ndarray]:
+        if patch not in self._patches:
+            if patch not in self.manifest['patches']:
+                raise KeyError(f"No matchups for patch {patch}; have {sorted(self.manifest['patches'])}")
+            try:
+                self._patches[patch] = self._open(patch)
+            except FileNotFoundError:               # a commit since `load` replaced that generation: reload
+                self.__init__(self.path, MatchupMatrices.load(self.path).manifest)
+                self._patches[patch] = self._open(patch)
+        return self._patches[patch]
+
+    def _open(self, patch: str) -> Dict[str, np.ndarray]:
+        generation = self.manifest['patches'][patch]
+        return {name: np.load(_matrix_path(self.path, patch, name, generation), mmap_mode='r') for name in MATRICES}
+
+    def _tier_slice(self, tier: Optional[str]):
+        return slice(None) if tier is None else _TIER_INDEX[tier]
+
+    def _rates(self, games: np.ndarray, wins: np.ndarray, min_games: int, limit: int) -> List[Dict[str, Any]]:
+        """Top `limit` entries by win rate among those with at least `min_games` games."""
+        rate = np.divide(wins, games, out=np.zeros(len(games)), where=games > 0)
+        keep = np.flatnonzero(games >= max(1, min_games))
+        keep = keep[np.lexsort((-games[keep], -rate[keep]))][:limit]
+        return [{'championId': self.champions[i], 'championName': self.champion_names.get(self.champions[i]),
+                 'games': int(games[i]), 'wins': int(wins[i]), 'winRate': round(float(rate[i]), 4)}
+                for i in keep if i < len(self.champions)]
+
+    def matchup(self, champion: int, opponent: int, position: str, patch: str, tier: str = None) -> Dict[str, Any]:
+        """Games / wins of `champion` against `opponent` in the `position` lane (all tiers when `tier` is None)."""
+        a, b = self._champion_index.get(champion), self._champion_index.get(opponent)
+        if a is None or b is None:
+            return {'games': 0, 'wins': 0, 'winRate': None}
+        m = self._matrices(patch)
+        t, p = self._tier_slice(tier), _POSITION_INDEX[position]
+        games = int(np.sum(m['matchup_games'][t, p, a, b]))
+        wins = int(np.sum(m['matchup_wins'][t, p, a, b]))
+        return {'games': games, 'wins': wins, 'winRate': round(wins / games, 4) if games else None}
+
+    def counters(self, champion: int, position: str, patch: str, tier: str = None, min_games: int = 20,
+                 limit: int = 10) -> List[Dict[str, Any]]:
+        """Lane opponents with the best win rate against `champion` (one row of the matrix)."""
+        a = self._champion_index.get(champion)
+        if a is None:
+            return []
+        m = self._matrices(patch)
+        t, p = self._tier_slice(tier), _POSITION_INDEX[position]
+        games = m['matchup_games'][t, p, a, :]
+        wins = m['matchup_wins'][t, p, a, :]
+        if tier is None:
+            games, wins = games.sum(axis=0), wins.sum(axis=0)
+        # win rate of the opponents: their wins are this champion's losses
+        return self._rates(np.asarray(games), np.asarray(games) - np.asarray(wins), min_games, limit)
+
+    def synergy(self, champion: int, ally: int, patch: str, tier: str = None) -> Dict[str, Any]:
+        """Games / wins with `champion` and `ally` on the same team."""
+        a, b = self._champion_index.get(champion), self._champion_index.get(ally)
+        if a is None or b is None:
+            return {'games': 0, 'wins': 0, 'winRate': None}
+        m = self._matrices(patch)
+        t = self._tier_slice(tier)
+        games = int(np.sum(m['synergy_games'][t, a, b]))
+        wins = int(np.sum(m['synergy_wins'][t, a, b]))
+        return {'games': games, 'wins': wins, 'winRate': round(wins / games, 4) if games else None}
+
+    def best_duos(self, champion: int, patch: str, tier: str = None, min_games: int = 20, limit: int = 10) -> List[Dict[str, Any]]:
+        """Allies with the best win rate together with `champion`."""
+        a = self._champion_index.get(champion)
+        if a is None:
+            return []
+        m = self._matrices(patch)
+        t = self._tier_slice(tier)
+        games, wins = m['synergy_games'][t, a, :], m['synergy_wins'][t, a, :]
+        if tier is None:
+            games, wins = games.sum(axis=0), wins.sum(axis=0)
+        return self._rates(np.asarray(games), np.asarray(wins), min_games, limit)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('path', help='matchup directory (created if missing)')
+    p.add_argument('--rebuild', action='store_true', help='recount all stored matches instead of only the new ones')
+    p.add_argument('--chunk-size', type=int, default=5000, help='matches counted per batch')
+    args = p.parse_args(argv)
+
+    import DB_client
+    start = time.perf_counter()
+    added = build_matchups(DB_client.db, args.path, args.rebuild, args.chunk_size)
+    print(f"counted {added} matches into {args.path} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
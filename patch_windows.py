@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from get_env_var import get_env_var
+from get_patch import get_patch
+
+# patch (major.minor of `gameVersion`) -> UTC day the patch went live. A patch runs until the next one starts.
+# Windows are a superset of the patch (regions deploy at different hours): the exact patch is still
+# checked per match with get_patch(gameVersion). Add new patches here or via the `patchwindows` env var.
+PATCH_STARTS = {
+    '15.23': '2025-11-19',
+    '15.24': '2025-12-03',
+}
+
+def parse_utc(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _version_key(patch: str):
+    return tuple(int(p) for p in patch.split('.'))
+
+def get_patch_starts() -> Dict[str, datetime]:
+    """`PATCH_STARTS` plus the `patchwindows` env var (ie. `16.1=2026-01-08,16.2=2026-01-21`), sorted by version."""
+    starts = dict(PATCH_STARTS)
+    for item in get_env_var('patchwindows', '').split(','):
+        if '=' in item:
+            patch, start = item.split('=', 1)
+            if get_patch(patch.strip()) is None:
+                raise ValueError(f"Invalid patch '{patch}' in patchwindows, expected ie. 16.1")
+            starts[get_patch(patch.strip())] = start
+    return {p: parse_utc(starts[p]) for p in sorted(starts, key=_version_key)}
+
+def get_patch_window(patch: str) -> Tuple[datetime, Optional[datetime]]:
+    """(start, end) of `patch`; end is None for the latest known patch (still live)."""
+    starts = get_patch_starts()
+    patch = get_patch(patch) or patch
+    if patch not in starts:
+        raise ValueError(f"Unknown patch '{patch}'. Known patches: {', '.join(starts)} (add more with the patchwindows env var)")
+    patches = list(starts)
+    i = patches.index(patch)
+    return starts[patch], starts[patches[i + 1]] if i + 1 < len(patches) else None
+
+def get_latest_patch() -> str:
+    return list(get_patch_starts())[-1]
+
+def get_patch_of_time(dt: datetime) -> Optional[str]:
+    """Patch that was live at `dt` (None if before the first known patch)."""
+    current = None
+    for patch, start in get_patch_starts().items():
+        if start > dt:
+            break
+        current = patch
+    return current
+
+def split_window(start: datetime, end: datetime, slice_hours: float) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into consecutive slices of `slice_hours` (the last one may be shorter)."""
+    step = timedelta(hours=slice_hours)
+    slices = []
+    while start < end:
+        slices.append((start, min(start + step, end)))
+        start += step
+    return slices
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import deque
+
+MAX_API_REQUESTS = 100
+API_REQ_RESET_SECs = 120  # seconds
+
+class RateLimiter:
+    """Sliding window limiter: at most `max_requests` per `window_secs`. Thread safe."""
+    def __init__(self, max_requests=MAX_API_REQUESTS, window_secs=API_REQ_RESET_SECs):
+        self.max_requests = max_requests
+        self.window_secs = window_secs
+        self._request_timestamps = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        # Remove timestamps older than window_secs
+        while self._request_timestamps and now - self._request_timestamps[0] > self.window_secs:
+            self._request_timestamps.popleft()
+
+    def time_until_available(self) -> float:
+        """Seconds until a request would be allowed (0 if one is allowed now)."""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            if len(self._request_timestamps) < self.max_requests:
+                return 0
+            # Wait until the oldest request leaves the window
+            return self.window_secs - (now - self._request_timestamps[0])
+
+    def try_acquire(self) -> bool:
+        """Record a request and return True if one is allowed now, else return False."""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            if len(self._request_timestamps) < self.max_requests:
+                # Record the new request timestamp
+                self._request_timestamps.append(now)
+                return True
+            return False
+
+    def wait(self, name=''):
+        """Block until a request is allowed, then record it."""
+        while not self.try_acquire():
+            wait_time = self.time_until_available()
+            if wait_time > (self.window_secs / 2):                             # only print if waiting significant time to not flood output
+                print(f"Rate limit reached {name}. Sleeping for {int(wait_time)} seconds...")
+            time.sleep(wait_time)
@@ -0,0 +1,49 @@
+from get_env_var import get_env_var
+
+DEFAULT_PLATFORM = 'NA1'
+
+# platform routing value -> regional routing value (match-v5 is served by the regional hosts)
+PLATFORM_TO_REGION = {
+    'NA1': 'americas', 'BR1': 'americas', 'LA1': 'americas', 'LA2': 'americas',
+    'EUW1': 'europe', 'EUN1': 'europe', 'TR1': 'europe', 'RU': 'europe', 'ME1': 'europe',
+    'KR': 'asia', 'JP1': 'asia',
+    'OC1': 'sea', 'SG2': 'sea', 'TW2': 'sea', 'VN2': 'sea',
+}
+
+# optional per platform gameID floors; patches are selected by time (patch_windows.py), not by gameID
+DEFAULT_MATCHID_THRESHOLDS = {}
+
+def normalize_platform(platform: str) -> str:
+    platform = (platform or DEFAULT_PLATFORM).strip().upper()
+    if platform not in PLATFORM_TO_REGION:
+        raise ValueError(f"Unknown platform '{platform}'. Expected one of: {', '.join(PLATFORM_TO_REGION)}")
+    return platform
+
+def get_platform_host(platform: str) -> str:
+    """Host for platform routed APIs (league-v4, summoner-v4, ...), ie. `na1.api.riotgames.com`."""
+    return f"https://{normalize_platform(platform).lower()}.api.riotgames.com"
+
+def get_regional_host(platform: str) -> str:
+    """Host for regionally routed APIs (match-v5), ie. `americas.api.riotgames.com` for NA1."""
+    return f"https://{PLATFORM_TO_REGION[normalize_platform(platform)]}.api.riotgames.com"
+
+def get_platform_from_matchID(matchID: str) -> str:
+    """`EUW1_7412345678` -> `EUW1`."""
+    return normalize_platform(matchID.split('_', 1)[0])
+
+def get_platforms():
+    """Platforms to crawl, from the comma separated `platforms` env var (default: NA1)."""
+    platforms = get_env_var('platforms', DEFAULT_PLATFORM)
+    return [normalize_platform(p) for p in platforms.split(',') if p.strip()]
+
+def get_matchID_thresholds():
+    """Per platform minimum gameID, from `matchidthresholds` env var ie. `NA1=5421000000,EUW1=7600000000`.
+
+    Platforms without a threshold accept every matchID (the patch start time already filters old games).
+    """
+    thresholds = dict(DEFAULT_MATCHID_THRESHOLDS)
+    for item in get_env_var('matchidthresholds', '').split(','):
+        if '=' in item:
+            platform, threshold = item.split('=', 1)
+            thresholds[normalize_platform(platform)] = int(threshold.strip().replace('_', ''))
+    return thresholds
@@ -0,0 +1,205 @@
+import os
+import json
+from concurrent.futures import Executor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from get_env_var import get_env_var
+
+DEFAULT_SPOOL_DIR = os.path.join('data', 'spool')
+
+class Spool:
+    """Append-only write-ahead log of fetched-but-not-yet-persisted API payloads + per-puuid checkpoints.
+
+    Every API payload is appended to `spool.jsonl` as soon as it is fetched, grouped by matchID:
+        {"op": "payload", "group": <matchID>, "kind": "match"|"league", "key": <matchID|puuid>, "data": ...}
+        {"op": "end", "group": <matchID>}     all payloads of the group fetched, ready to persist (fsync'd)
+        {"op": "ack", "group": <matchID>}     group persisted to the DB (or skipped)
+    Appends are fsync'd every `fsync_every` records and always on `end`.
+
+    On startup `replay()` persists every ended-but-unacked group, keeps payloads of unfinished groups
+    in memory so `fetch()` serves them without calling the API again, then compacts the file. While
+    crawling, `ack()` compacts it too (see there).
+
+    `checkpoints.json` keeps the matchIDs list of each puuid being crawled so an interrupted puuid
+    resumes mid-list instead of calling matches-by-puuid again.
+
+    `name` gives each crawl loop (one per platform) its own sub directory.
+    """
+    def __init__(self, spool_dir: str = None, name: str = '', fsync_every: int = 32, compact_every: int = 100):
+        self.spool_dir = os.path.join(spool_dir or get_env_var('spooldir', DEFAULT_SPOOL_DIR), name)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.path = os.path.join(self.spool_dir, 'spool.jsonl')
+        self.checkpoint_path = os.path.join(self.spool_dir, 'checkpoints.json')
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self._acks = 0
+        self._cache: Dict[tuple, Any] = {}          # (kind, key) -> payload
+        self._groups: Dict[str, List[tuple]] = {}    # group -> cache keys, to drop them on ack
+        self._unsynced = 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._checkpoints = self._load_checkpoints()
+
+    def _append(self, record: Dict[str, Any], sync: bool = False):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._unsynced += 1
+        if sync or self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Flush and fsync pending appends."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+    def fetch(self, kind: str, key: str, group: str, fetch_fn: Callable[[], Any]):
+        """Return the spooled payload for (`kind`, `key`) or call `fetch_fn()` and spool its result."""
+        cache_key = (kind, key)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+        data = fetch_fn()
+        self._append({'op': 'payload', 'group': group, 'kind': kind, 'key': key, 'data': data})
+        self._cache[cache_key] = data
+        self._groups.setdefault(group, []).append(cache_key)
+        return data
+
+    def fetch_many(self, kind: str, keys: List[str], group: str, fetch_fn: Callable[[str], Any], executor: Executor) -> Dict[str, Any]:
+        """`fetch` for several keys: `fetch_fn(key)` runs on `executor` for the keys not spooled yet.
+
+        Results are spooled from the calling thread as they complete; if a fetch fails the others are
+        still spooled before the error is raised. Returns `{key: payload}`.
+        """
+        missing = [k for k in dict.fromkeys(keys) if (kind, k) not in self._cache]
+        futures = {executor.submit(fetch_fn, key): key for key in missing}
+        error = None
+        for future in as_completed(futures):
+            try:
+                data = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            key = futures[future]
+            self._append({'op': 'payload', 'group': group, 'kind': kind, 'key': key, 'data': data})
+            self._cache[(kind, key)] = data
+            self._groups.setdefault(group, []).append((kind, key))
+        if error is not None:
+            raise error
+        return {k: self._cache[(kind, k)] for k in keys}
+
+    def end(self, group: str):
+        """Mark every payload of `group` as fetched. Durable once this returns."""
+        self._append({'op': 'end', 'group': group}, sync=True)
+
+    def ack(self, group: str):
+        """Mark `group` as persisted and drop its payloads from memory.
+
+        The live crawl never calls `replay()` again, so the file is compacted here: truncated when no
+        other group is pending (every record in it is acked), else rewritten every `compact_every` acks.
+        """
+        self._append({'op': 'ack', 'group': group})
+        for cache_key in self._groups.pop(group, []):
+            self._cache.pop(cache_key, None)
+        self._acks += 1
+        if not self._groups:
+            self._file.flush()
+            self._file.truncate(0)
+            self.sync()
+            self._acks = 0
+        elif self._acks >= self.compact_every:
+            self._compact({g: {k: self._cache[k] for k in keys if k in self._cache} for g, keys in self._groups.items()})
+
+    def _compact(self, pending: Dict[str, Dict[tuple, Any]]):
+        """Atomically rewrite the file with only the payloads of the `pending` groups."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for group, group_payloads in pending.items():
+                for (kind, key), data in group_payloads.items():
+                    f.write(json.dumps({'op': 'payload', 'group': group, 'kind': kind, 'key': key, 'data': data},
+                                       separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._unsynced = 0
+        self._acks = 0
+
+    def _read_records(self) -> List[Dict[str, Any]]:
+        records = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    print("Skipping torn spool record (crash during write)")
+        return records
+
+    def replay(self, persist_fn: Callable[[str, Dict[tuple, Any]], None]) -> int:
+        """Persist ended-but-unacked groups via `persist_fn(group, {(kind, key): data})`, then compact.
+
+        Returns the number of groups replayed.
+        """
+        self.sync()
+        payloads: Dict[str, Dict[tuple, Any]] = {}
+        ended, acked = set(), set()
+        for record in self._read_records():
+            group = record.get('group')
+            if record['op'] == 'payload':
+                payloads.setdefault(group, {})[(record['kind'], record['key'])] = record['data']
+            elif record['op'] == 'end':
+                ended.add(group)
+            elif record['op'] == 'ack':
+                acked.add(group)
+
+        replayed = 0
+        for group in ended - acked:
+            persist_fn(group, payloads.get(group, {}))
+            acked.add(group)
+            replayed += 1
+
+        # keep unfinished groups (fetched payloads of an interrupted match) so they are not fetched again
+        pending = {g: p for g, p in payloads.items() if g not in acked}
+        self._compact(pending)
+
+        self._cache.clear()
+        self._groups.clear()
+        for group, group_payloads in pending.items():
+            self._cache.update(group_payloads)
+            self._groups[group] = list(group_payloads)
+        return replayed
+
+    def _load_checkpoints(self) -> Dict[str, Dict[str, List[str]]]:
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            print("Ignoring unreadable checkpoint file:", self.checkpoint_path)
+            return {}
+
+    def _write_checkpoints(self):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._checkpoints, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def checkpointed_puuids(self) -> List[str]:
+        """puuids whose crawl was interrupted, to be resumed first."""
+        return list(self._checkpoints)
+
+    def get_checkpoint(self, puuid: str) -> Optional[Dict[str, List[str]]]:
+        """Return `{'matchIDs': [...], 'done': [...]}` for an interrupted puuid, or None."""
+        return self._checkpoints.get(puuid)
+
+    def save_checkpoint(self, puuid: str, matchIDs_list: List[str], done: List[str]):
+        self._checkpoints[puuid] = {'matchIDs': list(matchIDs_list), 'done': list(done)}
+        self._write_checkpoints()
+
+    def clear_checkpoint(self, puuid: str):
+        if self._checkpoints.pop(puuid, None) is not None:
+            self._write_checkpoints()
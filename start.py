@@ -3,9 +3,18 @@ import API_league_v4
 import API_matches
 import API_match
 import DB_client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from DB_client_base import DuplicateMatchError
+from concurrency_controller import DEFAULT_MAX_CONCURRENCY, concurrency_metrics
+from get_env_var import get_env_var
+from patch_windows import get_latest_patch, get_patch_window
+from region_router import DEFAULT_PLATFORM, get_matchID_thresholds, get_platforms
+from spool import Spool
                         
-# 5420859667 is latest gameID of 15.23
-def is_matchID_after_threshold(matchID, region_prefix = "NA1_", threshold = 5_421_000_000) -> bool:
+# optional gameID floor per platform (region_router.get_matchID_thresholds), on top of the patch start time
+def is_matchID_after_threshold(matchID, region_prefix = "NA1_", threshold = 0) -> bool:
     try:
         return int(matchID[len(region_prefix):]) > threshold
     except ValueError:
@@ -25,58 +34,187 @@ def should_process_match(match_json, queue_id=420, min_duration=500) -> bool:
     except Exception:
         return False
 
-def lookup_and_process_matches_for_oldest_ranked_puuids(DEBUG=False):
-    try:
-        while True:
-            df_puuids = DB_client.db.select_oldest_ranked_puuids_df()
-            for puuid in df_puuids['puuid']:
-                if DEBUG:
-                    print(puuid)
-                matchIDs_list = API_matches.get_matches_API_json_by_puuid(puuid)                      # even if null continue to update puuid
-                if DEBUG:
-                    print('total matchIDs for puuid:', len(matchIDs_list))
+_league_fetch_pool = None
+_league_fetch_pool_lock = threading.Lock()
 
-                # only want V15.24 games
-                matchIDs_list = [m for m in (matchIDs_list or []) if is_matchID_after_threshold(m)]
-                if DEBUG:
-                    print('total matchIDs above threshold:', len(matchIDs_list))
+def get_league_fetch_pool():
+    """Threads the participants' league lookups of a match run on; how many are actually in flight per
+    API host is decided by its AIMD controller (concurrency_controller.py)."""
+    global _league_fetch_pool
+    with _league_fetch_pool_lock:
+        if _league_fetch_pool is None:
+            _league_fetch_pool = ThreadPoolExecutor(max_workers=int(get_env_var('maxconcurrency', DEFAULT_MAX_CONCURRENCY)),
+                                                    thread_name_prefix='league-fetch')
+        return _league_fetch_pool
 
-                matchIDs_list = DB_client.db.select_matches_in_list_not_in_table(matchIDs_list)       # even if null continue to update puuid
-                if DEBUG:
-                    print('new matchIDs to process:', len(matchIDs_list))
+def persist_match(matchID, match_json, leagues_v4_by_puuid, DEBUG=False):
+    """Write the participants' solo queue leagues and the match in one transaction.
+
+    A match stored meanwhile by another crawler (ie. a backfill of the live patch) is left as is."""
+    session = None
+    try:
+        # mongoDB randomly closing transaction? runtime limit?
+        session = DB_client.db.begin_transaction()
 
-                for matchID in matchIDs_list:
+        for participant_puuid, leagues_v4_json in leagues_v4_by_puuid.items():
+            for league_v4_json in leagues_v4_json or []:
+                if league_v4_json['queueType'] == 'RANKED_SOLO_5x5':
+                    DB_client.db.merge_league_v4_no_commit(league_v4_json, session, match_json['info'].get('platformId'))
                     if DEBUG:
-                        print('processing matchID:', matchID)
-
-                    match_json = API_match.get_match_API_json_by_matchID(matchID)
-                    if should_process_match(match_json):   
-                        try:
-                            # mongoDB randomly closing transaction? runtime limit?
-                            session = DB_client.db.begin_transaction()
-
-                            for participant in match_json['info']['participants']:  # shouldn't be null after gamecomplete
-                                if participant['puuid'] != puuid and participant['puuid'] != 'BOT':                      # don't update initial participant leagueV4 yet
-                                    leagues_v4_json = API_league_v4.get_league_v4_API_json_by_puuid(participant['puuid'])
-                                    for league_v4_json in leagues_v4_json:
-                                        if league_v4_json['queueType'] == 'RANKED_SOLO_5x5':
-                                            DB_client.db.merge_league_v4_no_commit(league_v4_json, None)
-                                            if DEBUG:
-                                                print('processing puuid:', participant['puuid'])
-
-                            DB_client.db.insert_match_no_commit(matchID, match_json['metadata']['dataVersion'], match_json['info'], None)
-                            DB_client.db.commit_transaction(session)
-                        finally:
-                            DB_client.db.close_transaction(session)
-
-                # fetch latest league data and persist via DB_client.db client
-                leagues_v4_json = API_league_v4.get_league_v4_API_json_by_puuid(puuid)
-                DB_client.db.merge_league_v4(puuid, leagues_v4_json)
+                        print('processing puuid:', participant_puuid)
+
+        DB_client.db.insert_match_no_commit(matchID, match_json['metadata']['dataVersion'], match_json['info'], session)
+        DB_client.db.commit_transaction(session)
+    except DuplicateMatchError:
+        print('matchID already stored by another crawler:', matchID)
+    finally:
+        DB_client.db.close_transaction(session)
+
+def replay_spooled_match(matchID, payloads):
+    """`Spool.replay` callback: persist a match whose API payloads were all fetched before a crash."""
+    if not DB_client.db.select_matches_in_list_not_in_table([matchID]):
+        return                                                  # committed before the ack was written
+    match_json = payloads.get(('match', matchID))
+    leagues_v4_by_puuid = {key: data for (kind, key), data in payloads.items() if kind == 'league'}
+    print('replaying spooled matchID:', matchID)
+    persist_match(matchID, match_json, leagues_v4_by_puuid)
+
+def process_matchIDs(puuid, matchIDs_list, spool, platform=DEFAULT_PLATFORM, DEBUG=False, match_filter=should_process_match,
+                     stored_participants=False):
+    """Fetch and persist the not yet stored matches of `matchIDs_list` (found via `puuid`), checkpointing each one.
+
+    Returns (persisted matchIDs, puuids of their participants); with `stored_participants` the participants of
+    the matches of `matchIDs_list` that were already stored are included too.
+    """
+    checkpoint = spool.get_checkpoint(puuid)
+    done = checkpoint['done'] if checkpoint else []
+    spool.save_checkpoint(puuid, matchIDs_list, done)
+
+    done_set = set(done)
+    matchIDs_todo = DB_client.db.select_matches_in_list_not_in_table([m for m in matchIDs_list if m not in done_set])  # even if null continue to update puuid
+    if DEBUG:
+        print('new matchIDs to process:', len(matchIDs_todo))
+
+    persisted, participants = [], set()
+    if stored_participants:
+        todo_set = set(matchIDs_todo)
+        stored = [m for m in matchIDs_list if m not in todo_set and m not in done_set]
+        if stored:
+            participants.update(p for p in DB_client.db.select_participant_puuids(stored) if p and p not in (puuid, 'BOT'))
+    for matchID in matchIDs_todo:
+        if DEBUG:
+            print('processing matchID:', matchID)
+
+        # every fetched payload is spooled first so a crash doesn't lose rate limited API calls
+        match_json = spool.fetch('match', matchID, matchID, lambda: API_match.get_match_API_json_by_matchID(matchID))
+        if match_filter(match_json):
+            participant_puuids = [p['puuid'] for p in match_json['info']['participants']     # shouldn't be null after gamecomplete
+                                  if p['puuid'] != puuid and p['puuid'] != 'BOT']          # don't update initial participant leagueV4 yet
+            # fetched concurrently, spooled as they arrive
+            leagues_v4_by_puuid = spool.fetch_many(
+                'league', participant_puuids, matchID,
+                lambda participant_puuid: API_league_v4.get_league_v4_API_json_by_puuid(participant_puuid, platform),
+                get_league_fetch_pool())
+            spool.end(matchID)
+            persist_match(matchID, match_json, leagues_v4_by_puuid, DEBUG)
+            persisted.append(matchID)
+            participants.update(leagues_v4_by_puuid)
+        spool.ack(matchID)
+
+        done.append(matchID)
+        spool.save_checkpoint(puuid, matchIDs_list, done)
+    return persisted, participants
+
+def process_puuid(puuid, spool, platform=DEFAULT_PLATFORM, threshold=0, DEBUG=False, start_time=None):
+    checkpoint = spool.get_checkpoint(puuid)
+    if checkpoint:
+        matchIDs_list = checkpoint['matchIDs']                  # resume interrupted puuid
+        if DEBUG:
+            print('resuming from checkpoint, matchIDs done:', len(checkpoint['done']), '/', len(matchIDs_list))
+    else:
+        # only ranked solo games of the current patch (start_time), newest first
+        matchIDs_list = API_matches.get_matches_API_json_by_puuid(puuid, platform, start_time=start_time, queue=420)     # even if null continue to update puuid
+        if DEBUG:
+            print('total matchIDs for puuid:', len(matchIDs_list or []))
+
+        matchIDs_list = [m for m in (matchIDs_list or []) if is_matchID_after_threshold(m, platform + '_', threshold)]
+        if DEBUG:
+            print('total matchIDs above threshold:', len(matchIDs_list))
+
+    process_matchIDs(puuid, matchIDs_list, spool, platform, DEBUG)
+
+    # fetch latest league data and persist via DB_client.db client
+    leagues_v4_json = API_league_v4.get_league_v4_API_json_by_puuid(puuid, platform)
+    DB_client.db.merge_league_v4(puuid, leagues_v4_json, platform)
+    spool.clear_checkpoint(puuid)
+    if DEBUG:
+        print('LeagueV4 merges (unchanged entries are not rewritten):', DB_client.db.league_write_stats())
+        print('API concurrency per host:', concurrency_metrics())
+
+def seed_platform(platform, DEBUG=False):
+    """Seed LeagueV4 of a platform that has never been crawled with one page of ranked entries."""
+    leagues_v4_json = API_league_v4.get_league_v4_API_json_by_tier(platform=platform)
+    if DEBUG:
+        print(platform, 'seeded puuids:', len(leagues_v4_json or []))
+    session = None
+    try:
+        session = DB_client.db.begin_transaction()
+        DB_client.db.merge_league_v4_no_commit(leagues_v4_json, session, platform)
+        DB_client.db.commit_transaction(session)
+    finally:
+        DB_client.db.close_transaction(session)
+
+def lookup_and_process_matches_for_oldest_ranked_puuids(platform=DEFAULT_PLATFORM, DEBUG=False):
+    threshold = get_matchID_thresholds().get(platform, 0)
+    start_time, _ = get_patch_window(get_latest_patch())       # live crawl: games since the latest known patch
+    spool = Spool(name=platform)
+    try:
+        # persist whatever was fetched before the last crash / restart before crawling anything new
+        replayed = spool.replay(replay_spooled_match)
+        if replayed:
+            print(platform, 'replayed spooled matches:', replayed)
+
+        puuids = spool.checkpointed_puuids()                    # interrupted puuids first
+        while True:
+            puuids = puuids + [p for p in DB_client.db.select_oldest_ranked_puuids(platform=platform) if p not in puuids]
+            if not puuids:
+                seed_platform(platform, DEBUG)
+                if not DB_client.db.select_oldest_ranked_puuids(limit=1, platform=platform):
+                    time.sleep(60)                              # nothing to crawl yet, don't spin on the API
+                continue
+            for puuid in puuids:
+                if DEBUG:
+                    print(platform, puuid)
+                process_puuid(puuid, spool, platform, threshold, DEBUG, start_time)
+            puuids = []
     except KeyboardInterrupt:
         print("Shutting down...")
     except Exception as e:
-        print("Error occured: ", e)
+        print(platform, "Error occured: ", e)
         raise
+    finally:
+        spool.close()
+
+def crawl_all_platforms(DEBUG=False):
+    """One crawl loop per platform (each with its own API rate budgets), all writing to the shared database."""
+    platforms = get_platforms()
+    if len(platforms) == 1:
+        lookup_and_process_matches_for_oldest_ranked_puuids(platforms[0], DEBUG)
+        return
+
+    DB_client.get_db()                                          # connect once before the threads start
+    threads = [threading.Thread(target=lookup_and_process_matches_for_oldest_ranked_puuids, args=(p, DEBUG),
+                                name=f"crawl-{p}", daemon=True)
+               for p in platforms]
+    for t in threads:
+        t.start()
+    try:
+        while all(t.is_alive() for t in threads):
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print("Shutting down...")
+        return
+    raise RuntimeError("a platform crawl loop stopped: " + ', '.join(t.name for t in threads if not t.is_alive()))
 
 if __name__ == "__main__":
-    lookup_and_process_matches_for_oldest_ranked_puuids(True)
+    crawl_all_platforms(True)
@@ -0,0 +1,205 @@
+"""Read-only HTTP stats service over the collections the crawler fills.
+
+Usage:
+    python stats_service.py                 # port from env `statsport` (default 8080)
+
+Endpoints (JSON):
+    GET /champions?queue=420&patch=15.24            games / wins / winRate per champion
+    GET /players/<puuid>/history?limit=20           most recent games of a player
+    GET /players/<puuid>/summary                    totals, last 20 games, recent form (PlayerSummary)
+    GET /tiers?queueType=RANKED_SOLO_5x5&platform=NA1  players per tier / division
+    GET /health                                     ingest watermark + cache counters (never cached)
+
+Every response carries an ETag; a request with a matching If-None-Match gets 304 without a body.
+Results are cached (LRU, `statscachesize` entries, `statscachettl` seconds) and dropped early when the ingest
+watermark of the data they were computed from moves, so the crawler's writes and these reads don't pile
+aggregations onto the database for every request.
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from get_env_var import get_env_var
+
+DEFAULT_PORT = 8080
+DEFAULT_CACHE_TTL_SECs = 60
+DEFAULT_CACHE_SIZE = 1024
+# the watermark is itself a query: read it at most this often, not per request
+WATERMARK_POLL_SECs = 2.0
+
+class ResponseCache:
+    """LRU + TTL cache of encoded responses, each tagged with the ingest watermark it was computed at.
+
+    `get_or_compute()` serves a cached body while it is younger than `ttl` and its watermark is still current;
+    otherwise it recomputes it, once per key even if many requests miss at the same time.
+    """
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL_SECs):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any, bytes, str]]" = OrderedDict()   # key -> (created, watermark, body, etag)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str, watermark) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, entry_watermark, body, etag = entry
+            if entry_watermark != watermark or time.monotonic() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body, etag
+
+    def get_or_compute(self, key: str, watermark, compute: Callable[[], Any]) -> Tuple[bytes, str]:
+        """Return (json body, etag) of `key`, computing `compute()` on a miss."""
+        cached = self._lookup(key, watermark)
+        if cached:
+            return cached
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._lookup(key, watermark)       # another request computed it while we waited
+            if cached:
+                return cached
+            body = json.dumps(compute(), default=str, separators=(',', ':')).encode('utf-8')
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = (time.monotonic(), watermark, body, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+        return body, etag
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+class StatsService:
+    """Routes + cache + watermark polling; independent of the HTTP server so it can be driven directly."""
+    def __init__(self, db, cache: ResponseCache = None, watermark_poll_secs: float = WATERMARK_POLL_SECs):
+        self.db = db
+        self.cache = cache or ResponseCache()
+        self.watermark_poll_secs = watermark_poll_secs
+        self._watermark: Dict[str, Any] = {}
+        self._watermark_read = 0.0
+        self._watermark_lock = threading.Lock()
+
+    def watermark(self) -> Dict[str, Any]:
+        with self._watermark_lock:
+            if time.monotonic() - self._watermark_read > self.watermark_poll_secs:
+                self._watermark = self.db.select_ingest_watermark()
+                self._watermark_read = time.monotonic()
+            return self._watermark
+
+    def route(self, path: str, query: Dict[str, str]) -> Optional[Tuple[str, str, Callable[[], Any]]]:
+        """Return (cache key, watermark source, compute fn) for a request, or None if not found."""
+        parts = [p for p in path.split('/') if p]
+        if parts == ['champions']:
+            queue_id = int(query.get('queue', 420))
+            patch = query.get('patch')
+
+            def champions():
+                stats = self.db.select_champion_stats(queue_id=queue_id, patch=patch)
+                for s in stats:
+                    s['winRate'] = round(s['wins'] / s['games'], 4) if s['games'] else None
+                return {'queue': queue_id, 'patch': patch, 'champions': stats}
+            return f"champions:{queue_id}:{patch}", 'matches', champions
+        if len(parts) == 3 and parts[0] == 'players' and parts[2] == 'history':
+            puuid = parts[1]
+            limit = max(1, min(int(query.get('limit', 20)), 100))
+            return f"history:{puuid}:{limit}", 'matches', \
+                lambda: {'puuid': puuid, 'games': self.db.select_player_history(puuid, limit=limit)}
+        if len(parts) == 3 and parts[0] == 'players' and parts[2] == 'summary':
+            puuid = parts[1]
+            return f"summary:{puuid}", 'matches', \
+                lambda: self.db.select_player_summaries([puuid]).get(puuid) or {'puuid': puuid, 'games': 0}
+        if parts == ['tiers']:
+            queue_type = query.get('queueType', 'RANKED_SOLO_5x5')
+            platform = query.get('platform')
+            return f"tiers:{queue_type}:{platform}", 'leagues', \
+                lambda: {'queueType': queue_type, 'platform': platform,
+                         'tiers': self.db.select_tier_distribution(queueType=queue_type, platform=platform)}
+        return None
+
+    def handle(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes, Optional[str]]:
+        """Return (status, body, etag)."""
+        if path.rstrip('/') == '/health':
+            body = {'watermark': self.watermark(), 'cache': self.cache.stats()}
+            return 200, json.dumps(body, default=str).encode('utf-8'), None
+        try:
+            routed = self.route(path, query)
+        except ValueError as e:
+            return 400, json.dumps({'error': str(e)}).encode('utf-8'), None
+        if routed is None:
+            return 404, b'{"error":"not found"}', None
+        key, source, compute = routed
+        body, etag = self.cache.get_or_compute(key, self.watermark().get(source), compute)
+        return 200, body, etag
+
+def make_handler(service: StatsService):
+    class StatsRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'        # keep-alive: load tests / dashboards reuse connections
+
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+            try:
+                status, body, etag = service.handle(url.path, query)
+            except Exception as e:
+                print("stats request failed:", self.path, e)
+                status, body, etag = 500, b'{"error":"internal error"}', None
+            if etag and etag in (self.headers.get('If-None-Match') or ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', f"max-age={int(service.cache.ttl)}")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass                             # one line per request would drown the container log
+
+    return StatsRequestHandler
+
+def make_server(db, port: int = DEFAULT_PORT, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    cache = ResponseCache(max_entries=int(get_env_var('statscachesize', DEFAULT_CACHE_SIZE)),
+                          ttl=float(get_env_var('statscachettl', DEFAULT_CACHE_TTL_SECs)))
+    server = ThreadingHTTPServer((host, port), make_handler(StatsService(db, cache)))
+    server.daemon_threads = True
+    return server
+
+def main():
+    import DB_client
+    port = int(get_env_var('statsport', DEFAULT_PORT))
+    server = make_server(DB_client.db, port)
+    print(f"stats service listening on port {port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())